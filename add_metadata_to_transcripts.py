@@ -1,20 +1,39 @@
+import datetime
 import os
-import json
+import re
+import sys
+
+from corpus import CORPUS_PATH, append_records, corpus_ids, migrate_legacy_corpus, rewrite_corpus
 
-transcripts = []
 transcript_dir = "cleaned_transcripts"
+podcast_dir = "podcasts"
+
+# 2025-01-19, 2025_01_19 or 20250119 anywhere in the file name
+DATE_PATTERN = re.compile(r"(20\d{2})[-_.]?(0[1-9]|1[0-2])[-_.]?(0[1-9]|[12]\d|3[01])")
+
+
+def episode_date(filename):
+    """Episode date from the file name, else the modification time of the audio (or transcript)"""
+    match = DATE_PATTERN.search(filename)
+    if match:
+        try:
+            return datetime.date(*map(int, match.groups())).isoformat()
+        except ValueError:
+            pass
+    audio_path = os.path.join(podcast_dir, filename.split(".")[0].removesuffix("_cleaned") + ".mp3")
+    path = audio_path if os.path.exists(audio_path) else os.path.join(transcript_dir, filename)
+    return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
 
-for filename in os.listdir(transcript_dir):
-    if filename.endswith(".txt"):
-        with open(os.path.join(transcript_dir, filename), "r") as f:
-            text = f.read()
-            transcripts.append({
-                "id": filename.split(".")[0],
-                "text": text,
-                "title": f"Episode {filename.split('.')[0]}",
-                "date": "2025-01-01"
-            }
-            )
+
+def load_transcript(filename):
+    with open(os.path.join(transcript_dir, filename), "r") as f:
+        text = f.read()
+    return {
+        "id": filename.split(".")[0],
+        "text": text,
+        "title": f"Episode {filename.split('.')[0]}",
+        "date": episode_date(filename)
+    }
 
 def add_basic_metadata(transcripts):
     for transcript in transcripts:
@@ -25,7 +44,25 @@ def add_basic_metadata(transcripts):
         }
     return transcripts
 
-enriched_transcripts = add_basic_metadata(transcripts)
 
-with open("enriched_transcripts.json", "w") as f:
-    json.dump(enriched_transcripts, f, indent=4)
+if __name__ == "__main__":
+    # pass --rebuild to rewrite every record, e.g. after re-cleaning the transcripts
+    # (or to replace the placeholder 2025-01-01 dates of older corpora)
+    rebuild = "--rebuild" in sys.argv[1:]
+    if migrate_legacy_corpus():
+        print(f"Converted enriched_transcripts.json to {CORPUS_PATH}")
+
+    existing = set() if rebuild else corpus_ids()
+    filenames = sorted(
+        filename for filename in os.listdir(transcript_dir)
+        if filename.endswith(".txt") and filename.split(".")[0] not in existing
+    )
+
+    # one record at a time, so the corpus is never held in memory
+    enriched_transcripts = (add_basic_metadata([load_transcript(filename)])[0] for filename in filenames)
+    if rebuild:
+        rewrite_corpus(enriched_transcripts)
+        print(f"Rewrote {CORPUS_PATH} with {len(filenames)} episodes")
+    else:
+        written = append_records(enriched_transcripts)
+        print(f"Appended {written} new episodes to {CORPUS_PATH}")
@@ -0,0 +1,140 @@
+"""
+Concurrent summarization of cleaned_transcripts/ with rate-limit-aware scheduling.
+
+Requests run on an asyncio loop with at most `concurrency` in flight and are
+admitted through a requests-per-minute and tokens-per-minute budget. 429 and
+5xx responses are retried with exponential backoff (honouring retry-after);
+anything that still fails goes to summary/errors.log instead of into the
+summary file. Summaries are written through a temp file, so a transcript
+that already has a summary (and is skipped) has a complete one.
+
+Run against the local stub with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+(see stub_openai_server.py).
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import openai
+from openai import AsyncOpenAI
+
+from clean_episodes import token_counter
+from llm_cache import CachedOpenAI
+from summarization import (ERROR_LOG, MAX_TOKENS, MODEL, TEMPERATURE, build_messages, folder_path, list_transcripts,
+                           log_error, output_folder_path, summary_path_for, write_summary)
+
+count_tokens = token_counter()
+
+
+def estimate_tokens(messages, max_tokens=MAX_TOKENS):
+    """Prompt plus completion tokens a request can use, for the TPM budget"""
+    return sum(count_tokens(message["content"]) for message in messages) + max_tokens
+
+
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.capacity = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = dict(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for key, capacity in self.capacity.items():
+            self.available[key] = min(capacity, self.available[key] + capacity * elapsed / 60)
+
+    async def acquire(self, tokens):
+        # a request larger than the whole budget only has to wait for a full bucket
+        tokens = min(tokens, self.capacity["tokens"])
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.available["requests"] >= 1 and self.available["tokens"] >= tokens:
+                    self.available["requests"] -= 1
+                    self.available["tokens"] -= tokens
+                    return
+                missing_requests = max(0.0, 1 - self.available["requests"]) / self.capacity["requests"]
+                missing_tokens = max(0.0, tokens - self.available["tokens"]) / self.capacity["tokens"]
+                await asyncio.sleep(max(missing_requests, missing_tokens) * 60)
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def retry_delay(error, attempt, base_delay=1.0, max_delay=60.0):
+    """Exponential backoff with jitter, or the server's retry-after if it sent one"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+async def summarize_async(client, limiter, transcript_text, max_retries=6):
+    messages = build_messages(transcript_text)
+    tokens = estimate_tokens(messages)
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+
+
+async def summarize_folder(concurrency=8, requests_per_minute=500, tokens_per_minute=200_000, client=None):
+    """Summarize every transcript without a summary; returns (done, failed) counts"""
+    os.makedirs(output_folder_path, exist_ok=True)
+    # retries are handled here so they go through the rate limiter
+    client = client or CachedOpenAI(AsyncOpenAI(max_retries=0))
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    pending = [filename for filename in list_transcripts() if not os.path.exists(summary_path_for(filename))]
+    print(f"{len(pending)} transcripts to summarize")
+
+    async def run(filename):
+        async with semaphore:
+            with open(os.path.join(folder_path, filename), 'r', encoding='utf-8') as file:
+                transcript_text = file.read()
+            try:
+                summary = await summarize_async(client, limiter, transcript_text)
+            except Exception as e:
+                log_error(filename, e)
+                print(f"Failed {filename}: {e}")
+                return False
+            write_summary(filename, summary)
+            return True
+
+    results = await asyncio.gather(*(run(filename) for filename in pending))
+    return sum(results), len(results) - sum(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize cleaned transcripts concurrently")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=500, help="requests per minute budget")
+    parser.add_argument("--tpm", type=int, default=200_000, help="tokens per minute budget")
+    args = parser.parse_args()
+
+    done, failed = asyncio.run(summarize_folder(args.concurrency, args.rpm, args.tpm))
+    print(f"Summarized {done} transcripts, {failed} failed (see {ERROR_LOG})")
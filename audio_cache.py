@@ -0,0 +1,80 @@
+"""
+Decoded audio cache and background prefetch.
+
+Whisper decodes every mp3 with ffmpeg into 16 kHz mono float32 before the
+model runs. The decoded array is stored once as audio_cache/<sha256>.npy and
+memory-mapped on later runs, so re-transcribing or trying another model size
+skips ffmpeg entirely. Callers pass the sha256 the build manifest already
+computed so the mp3 is not read again just to find its cache entry.
+
+prefetch_audio() decodes the next files in a background thread while the
+current one is being transcribed. It is used where episodes are handled one
+at a time in the main process (the serial and chunked paths). Pool workers
+decode their own episodes, which already overlaps with the other workers'
+inference.
+"""
+import os
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+import whisper
+
+from transcript_manifest import file_sha256
+
+CACHE_DIR = Path("audio_cache")
+
+
+def cached_audio_path(audio_path, sha256=None, cache_dir=CACHE_DIR):
+    sha256 = sha256 or file_sha256(audio_path)
+    return Path(cache_dir) / f"{sha256}.npy"
+
+
+def load_cached_audio(audio_path, sha256=None, cache_dir=CACHE_DIR):
+    """
+    Return the 16 kHz float32 samples of audio_path as a read-only memmap
+
+    The first call decodes with ffmpeg and writes the cache; later calls only
+    map the file. Whisper accepts the memmap directly (torch.from_numpy does
+    not copy it).
+    """
+    npy_path = cached_audio_path(audio_path, sha256, cache_dir)
+    if not npy_path.exists():
+        npy_path.parent.mkdir(parents=True, exist_ok=True)
+        audio = whisper.load_audio(str(audio_path))
+        tmp_path = npy_path.with_name(f"{npy_path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, audio.astype(np.float32, copy=False))
+        os.replace(tmp_path, npy_path)
+    return np.load(npy_path, mmap_mode='r')
+
+
+def prefetch_audio(audio_files, depth=2, cache_dir=CACHE_DIR, sha256s=None):
+    """
+    Yield (audio_file, audio, error) while decoding up to `depth` files ahead
+
+    sha256s optionally maps str(audio_file) to its known digest.
+
+    Decoding runs in a daemon thread; ffmpeg and file I/O release the GIL, so
+    it overlaps with inference in the main thread. A decode failure is
+    yielded as `error` so the caller can skip that file.
+    """
+    sha256s = sha256s or {}
+    results = queue.Queue(maxsize=depth)
+    done = object()
+
+    def decode_all():
+        for audio_file in audio_files:
+            try:
+                audio = load_cached_audio(audio_file, sha256s.get(str(audio_file)), cache_dir)
+                results.put((audio_file, audio, None))
+            except Exception as e:
+                results.put((audio_file, None, e))
+        results.put(done)
+
+    threading.Thread(target=decode_all, daemon=True).start()
+    while True:
+        item = results.get()
+        if item is done:
+            return
+        yield item
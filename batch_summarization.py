@@ -0,0 +1,176 @@
+"""
+Bulk summarization through the OpenAI Batch API.
+
+Every transcript in cleaned_transcripts/ without a summary becomes one line
+of a JSONL job file in the batch input format
+
+    {"custom_id": "<file>", "method": "POST", "url": "/v1/chat/completions", "body": {...}}
+
+which is uploaded and submitted as a single batch. The job is recorded in
+summary/batch_jobs.json, so an interrupted run picks up the latest unfinished
+job (or a given --job-id) instead of submitting again. When the batch
+completes, each result is written to summary/summary_<file>.txt and failed
+requests go to summary/errors.log.
+
+Run against the local stub with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+(see stub_openai_server.py).
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from summarization import (ERROR_LOG, MAX_TOKENS, MODEL, TEMPERATURE, build_messages, folder_path, list_transcripts,
+                           log_error, output_folder_path, summary_path_for, write_summary)
+
+JOBS_PATH = os.path.join(output_folder_path, "batch_jobs.json")
+ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+load_dotenv()
+
+
+def load_jobs():
+    if not os.path.exists(JOBS_PATH):
+        return []
+    with open(JOBS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_jobs(jobs):
+    tmp_path = JOBS_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(jobs, f, indent=2)
+    os.replace(tmp_path, JOBS_PATH)
+
+
+def update_job(batch_id, **fields):
+    jobs = load_jobs()
+    for job in jobs:
+        if job["batch_id"] == batch_id:
+            job.update(fields)
+    save_jobs(jobs)
+
+
+def batch_request(filename, transcript_text):
+    """One line of the batch input file"""
+    return {
+        "custom_id": filename,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(transcript_text),
+            "max_tokens": MAX_TOKENS,
+            "temperature": TEMPERATURE,
+        },
+    }
+
+
+def write_job_file(filenames, job_path):
+    with open(job_path, "w", encoding="utf-8") as job_file:
+        for filename in filenames:
+            with open(os.path.join(folder_path, filename), "r", encoding="utf-8") as file:
+                job_file.write(json.dumps(batch_request(filename, file.read())) + "\n")
+
+
+def submit_batch(client, filenames):
+    """Write, upload and submit the job file; returns the batch id"""
+    job_path = os.path.join(output_folder_path, f"batch_input_{int(time.time())}.jsonl")
+    write_job_file(filenames, job_path)
+    with open(job_path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=ENDPOINT, completion_window="24h")
+
+    jobs = load_jobs()
+    jobs.append({
+        "batch_id": batch.id,
+        "input_file_id": input_file.id,
+        "job_file": job_path,
+        "requests": len(filenames),
+        "status": batch.status,
+        "submitted_at": int(time.time()),
+    })
+    save_jobs(jobs)
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_interval=30.0):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        update_job(batch_id, status=batch.status)
+        if batch.status in FINAL_STATUSES:
+            return batch
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"Batch {batch_id} is {batch.status} ({progress}), checking again in {poll_interval:.0f}s")
+        time.sleep(poll_interval)
+
+
+def write_results(client, batch):
+    """Fan the batch output out into summary files; returns (done, failed) counts"""
+    done = failed = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            filename = result["custom_id"]
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                log_error(filename, RuntimeError(result.get("error") or response.get("body")))
+                failed += 1
+                continue
+            write_summary(filename, response["body"]["choices"][0]["message"]["content"])
+            done += 1
+    if getattr(batch, "error_file_id", None):
+        for line in client.files.content(batch.error_file_id).text.splitlines():
+            if line.strip():
+                result = json.loads(line)
+                log_error(result.get("custom_id"), RuntimeError(result.get("error")))
+                failed += 1
+    update_job(batch.id, results_written=True)
+    return done, failed
+
+
+def latest_unfinished_job():
+    for job in reversed(load_jobs()):
+        if not job.get("results_written") and job["status"] not in FINAL_STATUSES - {"completed"}:
+            return job["batch_id"]
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize cleaned transcripts as one OpenAI batch job")
+    parser.add_argument("--job-id", help="resume this batch instead of the latest unfinished one")
+    parser.add_argument("--new", action="store_true", help="submit a new batch even if one is unfinished")
+    parser.add_argument("--no-wait", action="store_true", help="submit and exit without polling")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="seconds between status checks")
+    args = parser.parse_args()
+
+    os.makedirs(output_folder_path, exist_ok=True)
+    client = OpenAI()
+
+    batch_id = args.job_id or (None if args.new else latest_unfinished_job())
+    if batch_id:
+        print(f"Resuming batch {batch_id}")
+    else:
+        pending = [filename for filename in list_transcripts() if not os.path.exists(summary_path_for(filename))]
+        if not pending:
+            print("Every transcript already has a summary")
+            raise SystemExit(0)
+        batch_id = submit_batch(client, pending)
+        print(f"Submitted batch {batch_id} with {len(pending)} requests")
+
+    if args.no_wait:
+        print(f"Resume later with --job-id {batch_id}")
+        raise SystemExit(0)
+
+    batch = wait_for_batch(client, batch_id, args.poll_interval)
+    if batch.status != "completed":
+        print(f"Batch {batch_id} ended as {batch.status}; writing whatever results it produced")
+    done, failed = write_results(client, batch)
+    print(f"Summarized {done} transcripts, {failed} failed (see {ERROR_LOG})")
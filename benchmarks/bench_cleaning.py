@@ -0,0 +1,72 @@
+# Benchmark the precompiled cleaning engine in clean_episodes.py against the
+# original per-line clean_line. Uses the real transcripts/*.txt when present,
+# otherwise a synthetic transcript. Run from the repo root:
+#   python benchmarks/bench_cleaning.py
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clean_episodes import FILLER_WORDS, clean_lines
+
+
+def original_clean_line(line: str) -> str:
+    # clean_line as it was before the engine, kept verbatim for comparison
+    line_no_timestamps = re.sub(r"\[.*?\]", "", line)
+    allowed_chars = r"[^a-z0-9,.?!'\-\s]"
+    line_clean_punct = re.sub(allowed_chars, "", line_no_timestamps.lower())
+
+    filler_pattern = r'\b(?:' + '|'.join(re.escape(word) for word in FILLER_WORDS) + r')\b'
+
+    line_no_fillers = re.sub(filler_pattern, '', line_clean_punct, flags=re.IGNORECASE)
+
+    tokens = line_no_fillers.split()
+
+    line_final = " ".join(tokens)
+
+    return line_final
+
+
+def load_lines(transcript_dir="transcripts", min_lines=200_000):
+    lines = []
+    if os.path.isdir(transcript_dir):
+        for filename in sorted(os.listdir(transcript_dir)):
+            if filename.endswith(".txt"):
+                with open(os.path.join(transcript_dir, filename), "r", encoding="utf-8") as f:
+                    lines.extend(f)
+    if not lines:
+        random.seed(0)
+        words = ["um", "so", "the", "Masa", "trend", "like", "yeah", "2025", "coffee,", "it's", "Café",
+                 "uh", "flavor.", "really?", "yes!", "matcha", "good", "tinned-fish", "bye"]
+        for i in range(20_000):
+            text = " ".join(random.choice(words) for _ in range(random.randint(3, 25)))
+            lines.append(f"[0:{i // 60 % 60:02d}:{i % 60:02d} --> 0:{i // 60 % 60:02d}:{i % 60:02d}] {text}\n")
+    while len(lines) < min_lines:
+        lines = lines + lines
+    return lines
+
+
+def main():
+    lines = load_lines()
+
+    start = time.perf_counter()
+    before = [cleaned for cleaned in (original_clean_line(line) for line in lines) if cleaned.strip()]
+    before_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = list(clean_lines(lines))
+    after_seconds = time.perf_counter() - start
+
+    assert before == after, "cleaning engine output differs from the original clean_line"
+
+    print(f"lines:             {len(lines)}")
+    print(f"original per-line: {len(lines) / before_seconds:,.0f} lines/s")
+    print(f"cleaning engine:   {len(lines) / after_seconds:,.0f} lines/s")
+    print(f"speedup:           {before_seconds / after_seconds:.1f}x (outputs identical)")
+
+
+if __name__ == "__main__":
+    main()
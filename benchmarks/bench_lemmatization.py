@@ -0,0 +1,122 @@
+# Benchmark the batched, cached LemmaAnalyzer in topic_modeling_scripts/
+# lemma_analyzer.py against the original per-token LemmaCountVectorizer from
+# bertopic_explore.py. Uses cleaned_transcripts/combined_cleaned_lines.txt
+# when present, otherwise synthetic segments.
+#
+# Without --lookup this is also the equivalence check for the configuration
+# bertopic_explore.py uses: the original runs the full en_core_web_sm
+# pipeline, the new vectorizer runs it with parser and NER disabled, and the
+# run fails (listing the words whose lemmas differ) unless vocabulary and
+# counts are identical. Run from the repo root:
+#   python benchmarks/bench_lemmatization.py
+#   python benchmarks/bench_lemmatization.py --n-process 4
+#   python benchmarks/bench_lemmatization.py --lookup   # no trained model installed
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import spacy
+from sklearn.feature_extraction.text import CountVectorizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "topic_modeling_scripts"))
+
+from lemma_analyzer import LemmaAnalyzer, LemmaCountVectorizer
+
+
+def original_vectorizer(nlp):
+    # LemmaCountVectorizer as it was in bertopic_explore.py, kept verbatim for comparison
+    def lemmatize_text(text):
+        doc = nlp(text)
+        return " ".join([token.lemma_ for token in doc])
+
+    class OriginalLemmaCountVectorizer(CountVectorizer):
+        def build_analyzer(self):
+            analyzer = super(OriginalLemmaCountVectorizer, self).build_analyzer()
+            return lambda doc: (lemmatize_text(w) for w in analyzer(doc))
+
+    return OriginalLemmaCountVectorizer(stop_words="english")
+
+
+def load_segments(path=os.path.join("cleaned_transcripts", "combined_cleaned_lines.txt"), limit=None):
+    segments = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            segments = [line.strip() for line in f if line.strip()]
+    if not segments:
+        random.seed(0)
+        words = ["masa", "tortillas", "trends", "coffee", "flavors", "brewing", "fermented", "was", "better",
+                 "restaurants", "cooking", "chefs", "menus", "spicier", "sweeter", "matcha", "went", "stores",
+                 "ingredients", "people", "buying", "grown", "recipes", "tasted", "noodles", "children"]
+        segments = [" ".join(random.choice(words) for _ in range(random.randint(20, 80))) for _ in range(2_000)]
+    return segments[:limit] if limit else segments
+
+
+def lemma_differences(full_nlp, lemma_analyzer):
+    """(word, full pipeline lemma, analyzer lemma) for every cached word where they disagree"""
+    differences = []
+    for word, lemma in lemma_analyzer.cache.items():
+        full_lemma = " ".join(token.lemma_ for token in full_nlp(word))
+        if full_lemma != lemma:
+            differences.append((word, full_lemma, lemma))
+    return differences
+
+
+def load_nlp(args, disable=()):
+    if args.lookup:
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lemmatizer", config={"mode": "lookup"})
+        nlp.initialize()
+        return nlp
+    try:
+        return spacy.load(args.model, disable=list(disable))
+    except OSError as e:
+        sys.exit(f"Cannot load spaCy pipeline {args.model!r} ({e}); install it with "
+                 f"`python -m spacy download {args.model}` or pass --model <path>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the original and batched lemmatizing vectorizers")
+    parser.add_argument("--model", default="en_core_web_sm", help="spaCy pipeline name or path")
+    parser.add_argument("--lookup", action="store_true",
+                        help="use a blank English pipeline with lookup lemmas (needs spacy-lookups-data)")
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--limit", type=int, help="only use the first N segments")
+    args = parser.parse_args()
+
+    segments = load_segments(limit=args.limit)
+
+    full_nlp = load_nlp(args)
+    before = original_vectorizer(full_nlp)
+    start = time.perf_counter()
+    before_counts = before.fit_transform(segments)
+    before_seconds = time.perf_counter() - start
+
+    lemma_analyzer = LemmaAnalyzer(nlp=load_nlp(args, disable=["parser", "ner"]), n_process=args.n_process)
+    after = LemmaCountVectorizer(lemma_analyzer=lemma_analyzer, stop_words="english")
+    start = time.perf_counter()
+    after_counts = after.fit_transform(segments)
+    after_seconds = time.perf_counter() - start
+
+    differences = lemma_differences(full_nlp, lemma_analyzer)
+    if differences:
+        for word, full_lemma, lemma in differences[:20]:
+            print(f"  {word!r}: full pipeline {full_lemma!r}, batched {lemma!r}")
+        sys.exit(f"{len(differences)} of {len(lemma_analyzer.cache)} words lemmatize differently")
+    assert list(before.get_feature_names_out()) == list(after.get_feature_names_out()), "vocabularies differ"
+    assert before_counts.shape == after_counts.shape and (before_counts != after_counts).nnz == 0, "counts differ"
+
+    tokens = int(np.asarray(before_counts.sum()))
+    print(f"segments:           {len(segments)}")
+    vocabulary = len(after.get_feature_names_out())
+    print(f"pipeline:           {'blank en + lookup lemmas' if args.lookup else args.model}")
+    print(f"vocabulary:         {vocabulary} terms from {len(lemma_analyzer.cache)} surface forms")
+    print(f"original per-token: {before_seconds:.2f}s ({tokens / before_seconds:,.0f} tokens/s)")
+    print(f"batched + cached:   {after_seconds:.2f}s ({tokens / after_seconds:,.0f} tokens/s)")
+    print(f"speedup:            {before_seconds / after_seconds:.1f}x (vocabulary and counts identical)")
+
+
+if __name__ == "__main__":
+    main()
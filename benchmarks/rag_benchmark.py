@@ -0,0 +1,170 @@
+# Retrieval and synthesis benchmark for the RAG pipeline. Runs a fixed file of
+# queries with expected episode (or "episode:chunk" document) ids through the
+# retrievers used in llamaindex_rag_full_transcribes.py and reports recall@k,
+# MRR and p50/p95 latency for retrieval and synthesis separately.
+#
+# Offline by default: embeddings come from a deterministic feature-hashing
+# model and answers from LlamaIndex's MockLLM, so runs are repeatable and
+# free. Run from the repo root:
+#   python benchmarks/rag_benchmark.py
+#   python benchmarks/rag_benchmark.py --chunk-sizes 128 256 600 --top-k 3 5 --csv rag_benchmark.csv
+#   python benchmarks/rag_benchmark.py --corpus enriched_transcripts.jsonl --queries my_queries.jsonl
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core import QueryBundle, Settings, VectorStoreIndex
+from llama_index.core.llms import MockLLM
+from llama_index.core.response_synthesizers import get_response_synthesizer
+
+from bm25_index import BM25Retriever, HybridRetriever, tokenize
+from corpus import iter_documents
+from embedding_cache import CachedEmbedding, EmbeddingCache
+from local_vector_store import LocalVectorRetriever
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_fixture")
+RETRIEVERS = ("llamaindex", "vector", "bm25", "hybrid")
+
+
+class HashingBackend:
+    """Deterministic bag-of-words embedding: tokens and bigrams hashed into signed buckets"""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.model_name = f"feature-hashing-{dim}"
+
+    def _bucket(self, feature):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return digest % self.dim, 1.0 if digest >> 63 else -1.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                bucket, sign = self._bucket(feature)
+                vectors[row, bucket] += sign
+        return vectors
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def node_keys(node):
+    """Ids a retrieved node counts for: its episode and its source document"""
+    metadata = node.metadata
+    return {key for key in (metadata.get("episode_id"), metadata.get("id"), node.node.ref_doc_id) if key}
+
+
+def ranked_matches(nodes, expected):
+    """Ranks (1-based, over distinct matched ids) at which expected ids were retrieved"""
+    seen = []
+    for node in nodes:
+        for key in sorted(node_keys(node)):
+            if key not in seen:
+                seen.append(key)
+    return {key: seen.index(key) + 1 for key in expected if key in seen}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def build_retrievers(documents, chunk_size, top_k):
+    Settings.chunk_size = chunk_size
+    Settings.chunk_overlap = max(chunk_size // 12, 0)
+    index = VectorStoreIndex.from_documents(documents)
+    vector = LocalVectorRetriever.from_index(index, similarity_top_k=top_k)
+    return {
+        "llamaindex": index.as_retriever(similarity_top_k=top_k),
+        "vector": vector,
+        "bm25": BM25Retriever.from_nodes(vector.nodes, similarity_top_k=top_k),
+        "hybrid": HybridRetriever(vector, similarity_top_k=top_k),
+    }, len(vector.nodes)
+
+
+def run_config(retriever, queries, top_k, synthesizer=None):
+    recalls, reciprocal_ranks, retrieve_times, synthesize_times = [], [], [], []
+    for item in queries:
+        start = time.perf_counter()
+        nodes = retriever.retrieve(QueryBundle(item["query"]))
+        retrieve_times.append(time.perf_counter() - start)
+
+        ranks = ranked_matches(nodes, item["expected"])
+        recalls.append(sum(rank <= top_k for rank in ranks.values()) / len(item["expected"]))
+        reciprocal_ranks.append(1.0 / min(ranks.values()) if ranks else 0.0)
+
+        if synthesizer is not None:
+            start = time.perf_counter()
+            synthesizer.synthesize(item["query"], nodes=nodes)
+            synthesize_times.append(time.perf_counter() - start)
+
+    return {
+        f"recall@{top_k}": round(float(np.mean(recalls)), 3),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 3),
+        "retrieve_p50_ms": round(percentile(retrieve_times, 50), 3),
+        "retrieve_p95_ms": round(percentile(retrieve_times, 95), 3),
+        "synthesize_p50_ms": round(percentile(synthesize_times, 50), 3),
+        "synthesize_p95_ms": round(percentile(synthesize_times, 95), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG retrieval quality and latency offline")
+    parser.add_argument("--corpus", default=os.path.join(FIXTURE_DIR, "corpus.jsonl"))
+    parser.add_argument("--queries", default=os.path.join(FIXTURE_DIR, "queries.jsonl"))
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[128, 600])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3])
+    parser.add_argument("--retrievers", nargs="+", choices=RETRIEVERS, default=list(RETRIEVERS))
+    parser.add_argument("--response-modes", nargs="+", default=["compact"])
+    parser.add_argument("--no-synthesis", action="store_true", help="only measure retrieval")
+    parser.add_argument("--csv", help="also write the results table to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        Settings.embed_model = CachedEmbedding(EmbeddingCache(HashingBackend(), cache_dir=cache_dir))
+        Settings.llm = MockLLM(max_tokens=64)
+
+        documents = list(iter_documents(args.corpus))
+        queries = load_queries(args.queries)
+        print(f"{len(documents)} documents, {len(queries)} queries")
+
+        rows = []
+        for chunk_size in args.chunk_sizes:
+            for top_k in args.top_k:
+                retrievers, node_count = build_retrievers(documents, chunk_size, top_k)
+                modes = [None] if args.no_synthesis else args.response_modes
+                for name in args.retrievers:
+                    for mode in modes:
+                        synthesizer = get_response_synthesizer(response_mode=mode) if mode else None
+                        result = run_config(retrievers[name], queries, top_k, synthesizer)
+                        rows.append({"retriever": name, "chunk_size": chunk_size, "nodes": node_count,
+                                     "top_k": top_k, "response_mode": mode or "-",
+                                     "recall": result.pop(f"recall@{top_k}"), **result})
+
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+BM25 keyword index and hybrid (BM25 + vector) retrieval.
+
+BM25Index is an inverted index: for every term a posting array of document
+rows and their precomputed BM25 weights, so a query is a handful of
+scatter-adds into a score vector followed by an argpartition top-k. It is
+built once over the same nodes as the vector retriever (row i is node i in
+both), so the metadata bitmaps of LocalVectorStore apply to it as well.
+
+HybridRetriever fuses the BM25 and vector rankings with reciprocal rank
+fusion. Short queries whose terms all occur together in at least
+`similarity_top_k` nodes ("masa", "japanese convenience store") are answered
+from the keyword index alone, without embedding the query.
+"""
+import math
+import re
+
+import numpy as np
+
+from local_vector_store import top_k
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOP_WORDS = frozenset("""
+a about an and are as at be but by can do does did for from had has have he her his how i if in into is it
+its just me my no not of on or our she so some than that the their them then there these they this to up
+us was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.size = len(texts)
+        doc_terms = [tokenize(text) for text in texts]
+        lengths = np.array([len(terms) for terms in doc_terms], dtype=np.float32)
+        average_length = lengths.mean() if self.size and lengths.sum() else 1.0
+
+        # (term, row) pairs counted in one np.unique instead of per-document dicts
+        vocabulary = {}
+        term_ids = np.array([vocabulary.setdefault(term, len(vocabulary)) for terms in doc_terms for term in terms],
+                            dtype=np.int64)
+        token_rows = np.repeat(np.arange(self.size, dtype=np.int64), lengths.astype(np.int64))
+        pairs, tf = np.unique(term_ids * max(self.size, 1) + token_rows, return_counts=True)
+        pair_terms, pair_rows = np.divmod(pairs, max(self.size, 1))
+        boundaries = np.searchsorted(pair_terms, np.arange(len(vocabulary) + 1))
+
+        # the whole BM25 term weight is fixed at build time, queries only add
+        tf = tf.astype(np.float32)
+        length_norm = k1 * (1 - b + b * lengths / average_length)
+        weights = tf * (k1 + 1) / (tf + length_norm[pair_rows])
+        self.postings = {}
+        for term, term_id in vocabulary.items():
+            start, end = boundaries[term_id], boundaries[term_id + 1]
+            df = end - start
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            self.postings[term] = (pair_rows[start:end].astype(np.int32),
+                                   (idf * weights[start:end]).astype(np.float32))
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query, k=10, mask=None):
+        """
+        [(row, score)] of the k best matching rows, best first, and the number
+        of (allowed) rows that contain every query term
+        """
+        terms = set(tokenize(query))
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched_terms = np.zeros(self.size, dtype=np.int16)
+        for term in terms:
+            if term in self.postings:
+                rows, weights = self.postings[term]
+                scores[rows] += weights
+                matched_terms[rows] += 1
+
+        candidates = np.flatnonzero(scores)
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        full_matches = int(np.count_nonzero(matched_terms[candidates] == len(terms))) if terms else 0
+        best = candidates[top_k(scores[candidates], k)]
+        return [(int(row), float(scores[row])) for row in best], full_matches
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of ids; returns [(id, fused score)] best first"""
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
+
+
+try:
+    from llama_index.core import QueryBundle
+    from llama_index.core.retrievers import BaseRetriever
+    from llama_index.core.schema import MetadataMode, NodeWithScore
+except ImportError:
+    BaseRetriever = None
+
+if BaseRetriever is not None:
+    class BM25Retriever(BaseRetriever):
+        """Keyword-only retriever over a list of nodes"""
+
+        def __init__(self, index, nodes, similarity_top_k=3, mask=None):
+            super().__init__()
+            self.index = index
+            self.nodes = nodes
+            self.similarity_top_k = similarity_top_k
+            self.mask = mask
+
+        @classmethod
+        def from_nodes(cls, nodes, similarity_top_k=3):
+            nodes = list(nodes)
+            index = BM25Index([node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes])
+            return cls(index, nodes, similarity_top_k)
+
+        def _retrieve(self, query_bundle: QueryBundle):
+            hits, _ = self.index.search(query_bundle.query_str, self.similarity_top_k, self.mask)
+            return [NodeWithScore(node=self.nodes[row], score=score) for row, score in hits]
+
+    class HybridRetriever(BaseRetriever):
+        """
+        BM25 + vector retrieval fused with reciprocal rank fusion.
+        `vector_retriever` is a LocalVectorRetriever; its filters also restrict the keyword side.
+        """
+
+        def __init__(self, vector_retriever, bm25_index=None, similarity_top_k=3, candidates=20,
+                     rrf_k=60, keyword_shortcut=True, max_shortcut_terms=3):
+            super().__init__()
+            self.vector_retriever = vector_retriever
+            self.nodes = vector_retriever.nodes
+            self.bm25_index = bm25_index or BM25Index(
+                [node.get_content(metadata_mode=MetadataMode.NONE) for node in self.nodes]
+            )
+            self.similarity_top_k = similarity_top_k
+            self.candidates = candidates
+            self.rrf_k = rrf_k
+            self.keyword_shortcut = keyword_shortcut
+            self.max_shortcut_terms = max_shortcut_terms
+
+        def filtered(self, where=None, date_range=None, similarity_top_k=None):
+            """
+            A hybrid retriever over the same indexes that only searches matching nodes;
+            a larger similarity_top_k also widens the candidate lists it is fused from
+            """
+            similarity_top_k = similarity_top_k or self.similarity_top_k
+            candidates = max(self.candidates, self.candidates * similarity_top_k // self.similarity_top_k)
+            return HybridRetriever(self.vector_retriever.filtered(where, date_range, similarity_top_k), self.bm25_index,
+                                   similarity_top_k, candidates, self.rrf_k,
+                                   self.keyword_shortcut, self.max_shortcut_terms)
+
+        def _retrieve(self, query_bundle: QueryBundle):
+            vector = self.vector_retriever
+            mask = vector.store.filter_mask(vector.where, vector.date_range)
+            keyword_hits, full_matches = self.bm25_index.search(query_bundle.query_str, self.candidates, mask)
+
+            terms = tokenize(query_bundle.query_str)
+            if (self.keyword_shortcut and 0 < len(terms) <= self.max_shortcut_terms
+                    and full_matches >= self.similarity_top_k):
+                return [NodeWithScore(node=self.nodes[row], score=score)
+                        for row, score in keyword_hits[:self.similarity_top_k]]
+
+            query_embedding = query_bundle.embedding or vector.embed_model.get_query_embedding(
+                query_bundle.query_str)
+            vector_hits = vector.store.search(query_embedding, self.candidates, vector.where, vector.date_range)
+            fused = reciprocal_rank_fusion([[row for row, _ in keyword_hits], [row for row, _, _ in vector_hits]],
+                                           self.rrf_k)
+            return [NodeWithScore(node=self.nodes[row], score=score) for row, score in fused[:self.similarity_top_k]]
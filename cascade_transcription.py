@@ -0,0 +1,111 @@
+"""
+Two-pass cascade transcription.
+
+The whole episode is scanned with the tiny model. Segments that mention a
+keyword, or read like one of the seed phrases, mark regions of interest;
+those regions plus some padding are transcribed again with a larger model
+and replace the tiny segments they cover. Every segment carries a "model"
+key, written into the transcript as a [model] tag after the timestamps
+(clean_episodes.py strips bracketed text, so downstream cleaning is unchanged).
+"""
+import re
+from difflib import SequenceMatcher
+
+import whisper
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+# clean_episodes.py keeps the part of each show about next year's trends
+DEFAULT_KEYWORDS = ["2025", "trend", "trends", "trending", "prediction", "predictions", "flavor", "flavors"]
+DEFAULT_SEED_PHRASES = [
+    "food trends for next year",
+    "what we will be eating in 2025",
+    "the flavor of the year",
+    "my prediction for the biggest trend",
+]
+
+
+def _tag(segments, model_name, offset_seconds=0.0):
+    tagged = []
+    for segment in segments:
+        segment = dict(segment)
+        segment["start"] += offset_seconds
+        segment["end"] += offset_seconds
+        segment["model"] = model_name
+        tagged.append(segment)
+    return tagged
+
+
+def _words(text):
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def resembles_phrase(text, phrase, min_similarity=0.75):
+    """
+    True if some run of words in text is close to phrase
+
+    Each window of len(phrase) words is compared with the phrase character by
+    character, so misheard words from the tiny model still match, while the
+    rest of a long segment does not dilute the score.
+    """
+    words, phrase_words = _words(text), _words(phrase)
+    if not phrase_words:
+        return False
+    phrase = " ".join(phrase_words)
+    size = len(phrase_words)
+    for i in range(max(len(words) - size, 0) + 1):
+        if SequenceMatcher(None, " ".join(words[i:i + size]), phrase).ratio() >= min_similarity:
+            return True
+    return False
+
+
+def is_interesting(text, keywords=DEFAULT_KEYWORDS, seed_phrases=DEFAULT_SEED_PHRASES, min_similarity=0.75):
+    """True if text contains a keyword or a run of words close to a seed phrase"""
+    lowered = text.lower()
+    if any(re.search(r"\b" + re.escape(keyword.lower()) + r"\b", lowered) for keyword in keywords):
+        return True
+    return any(resembles_phrase(text, seed, min_similarity) for seed in seed_phrases)
+
+
+def find_regions(segments, total_seconds, keywords=DEFAULT_KEYWORDS, seed_phrases=DEFAULT_SEED_PHRASES,
+                 pad_seconds=30.0):
+    """Padded (start, end) regions around interesting segments, overlapping ones merged"""
+    regions = []
+    for segment in segments:
+        if not is_interesting(segment["text"], keywords, seed_phrases):
+            continue
+        start = max(segment["start"] - pad_seconds, 0.0)
+        end = min(segment["end"] + pad_seconds, total_seconds)
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [tuple(region) for region in regions]
+
+
+def cascade_transcribe(audio, scan_model, detail_model, detail_name, language="en",
+                       keywords=DEFAULT_KEYWORDS, seed_phrases=DEFAULT_SEED_PHRASES, pad_seconds=30.0):
+    """
+    Scan audio with scan_model and re-transcribe regions of interest with detail_model
+
+    Returns (segments, regions) with segments sorted by start time.
+    """
+    total_seconds = len(audio) / SAMPLE_RATE
+    scan_segments = _tag(scan_model.transcribe(audio, language=language, verbose=None)["segments"], "tiny")
+    regions = find_regions(scan_segments, total_seconds, keywords, seed_phrases, pad_seconds)
+
+    detail_segments = []
+    for start, end in regions:
+        clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        result = detail_model.transcribe(clip, language=language, verbose=None)
+        detail_segments.extend(_tag(result["segments"], detail_name, offset_seconds=start))
+
+    def covered(segment):
+        midpoint = (segment["start"] + segment["end"]) / 2
+        return any(start <= midpoint < end for start, end in regions)
+
+    segments = [segment for segment in scan_segments if not covered(segment)] + detail_segments
+    segments.sort(key=lambda segment: segment["start"])
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+    return segments, regions
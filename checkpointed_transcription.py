@@ -0,0 +1,156 @@
+"""
+Streaming transcription that survives interruption.
+
+The episode is decoded in consecutive slices. After each slice the finished
+segments are appended to `<stem>.txt.partial` and a sidecar
+`<stem>.checkpoint.json` records how far we got: the audio offset of the last
+completed segment, the byte size of the partial file, and the decoder prompt
+(tail of the previous text, which is what Whisper conditions on between
+windows). It also records what the partial was built from (audio sha256,
+model size, language); a rerun with the same inputs resumes from that offset,
+while a rerun with different ones starts over. The finished transcript is
+renamed into place so `transcripts/<stem>.txt` only ever exists complete.
+The structured rows for segments/<stem>.jsonl are streamed the same way.
+"""
+import json
+import os
+from pathlib import Path
+
+import whisper
+
+from segment_store import format_records, segment_path_for
+from transcribe_podcasts import format_segment_line, transcript_path_for
+from transcript_manifest import file_sha256
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+# Whisper keeps roughly this much previous text as its prompt
+PROMPT_CHARS = 400
+
+
+def checkpoint_path_for(txt_path):
+    txt_path = Path(txt_path)
+    return txt_path.with_name(f"{txt_path.stem}.checkpoint.json")
+
+
+def load_checkpoint(checkpoint_path):
+    """Return the saved checkpoint dict, or a fresh one"""
+    checkpoint = {"offset": 0.0, "bytes_written": 0, "segment_bytes_written": 0, "prompt": "", "segments_written": 0}
+    if checkpoint_path is not None and Path(checkpoint_path).exists():
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint.update(json.load(f))
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, checkpoint_path):
+    """Atomically replace the checkpoint file"""
+    tmp_path = Path(str(checkpoint_path) + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def transcribe_with_checkpoints(audio_path, model, language="en", slice_seconds=120, transcript_dir="transcripts",
+                                audio=None, model_size=None, sha256=None):
+    """
+    Transcribe audio_path slice by slice, appending to a partial transcript
+
+    Parameters:
+        audio_path (str): Path to the audio file
+        model: Loaded Whisper model
+        language (str): Language code or None for auto-detection
+        slice_seconds (float): Audio decoded between two checkpoints
+        transcript_dir (str): Folder holding the final transcript
+        audio (np.ndarray): Already decoded 16 kHz samples; decoded from audio_path if None
+        model_size (str): Name of the loaded model, recorded so a partial from another model is not resumed
+        sha256 (str): Known sha256 of audio_path; hashed here if None
+    """
+    txt_path = transcript_path_for(audio_path, transcript_dir)
+    partial_path = txt_path.with_name(txt_path.name + ".partial")
+    checkpoint_path = checkpoint_path_for(txt_path)
+    segment_path = segment_path_for(txt_path.stem)
+    segment_partial_path = segment_path.with_name(segment_path.name + ".partial")
+    segment_path.parent.mkdir(parents=True, exist_ok=True)
+
+    inputs = {
+        "audio_sha256": sha256 or file_sha256(audio_path),
+        "model_size": model_size or repr(getattr(model, "dims", None)),
+        "language": language,
+    }
+    checkpoint = load_checkpoint(checkpoint_path)
+    if not partial_path.exists() or not segment_partial_path.exists():
+        # A checkpoint without its partial file is stale
+        checkpoint = load_checkpoint(None)
+    elif checkpoint["offset"] > 0 and checkpoint.get("inputs") != inputs:
+        # Built from other audio or another model: never mix it into this transcript
+        print(f"Discarding the partial transcript of {Path(audio_path).name}: audio, model or language changed")
+        checkpoint = load_checkpoint(None)
+    elif checkpoint["offset"] > 0:
+        print(f"Resuming {Path(audio_path).name} at {checkpoint['offset']:.1f}s")
+
+    if audio is None:
+        audio = whisper.load_audio(str(audio_path))
+    total_seconds = len(audio) / SAMPLE_RATE
+
+    with open(partial_path, 'ab+') as partial, open(segment_partial_path, 'ab+') as segment_partial:
+        # Drop anything appended after the last checkpoint was saved
+        partial.truncate(checkpoint["bytes_written"])
+        partial.seek(checkpoint["bytes_written"])
+        segment_partial.truncate(checkpoint["segment_bytes_written"])
+        segment_partial.seek(checkpoint["segment_bytes_written"])
+
+        offset = checkpoint["offset"]
+        while offset < total_seconds:
+            start = int(offset * SAMPLE_RATE)
+            end = min(start + int(slice_seconds * SAMPLE_RATE), len(audio))
+            is_last = end == len(audio)
+
+            result = model.transcribe(
+                audio[start:end],
+                language=language,
+                initial_prompt=checkpoint["prompt"] or None,
+                verbose=None,
+            )
+            segments = result["segments"]
+            # The last segment of a slice may be cut mid-sentence; redo it next time
+            if not is_last and len(segments) > 1:
+                segments = segments[:-1]
+
+            shifted = []
+            for i, segment in enumerate(segments):
+                segment = dict(segment, id=checkpoint["segments_written"] + i,
+                               start=segment["start"] + offset, end=segment["end"] + offset)
+                partial.write(format_segment_line(segment).encode('utf-8'))
+                shifted.append(segment)
+            segment_partial.write(format_records(txt_path.stem, shifted).encode('utf-8'))
+            for f in (partial, segment_partial):
+                f.flush()
+                os.fsync(f.fileno())
+
+            if is_last:
+                offset = total_seconds
+            elif segments and segments[-1]["end"] > 0:
+                offset += segments[-1]["end"]
+            else:
+                offset += (end - start) / SAMPLE_RATE
+
+            text = " ".join(segment["text"].strip() for segment in segments)
+            checkpoint = {
+                "offset": offset,
+                "bytes_written": partial.tell(),
+                "segment_bytes_written": segment_partial.tell(),
+                "prompt": (checkpoint["prompt"] + " " + text).strip()[-PROMPT_CHARS:],
+                "segments_written": checkpoint["segments_written"] + len(segments),
+                "inputs": inputs,
+            }
+            save_checkpoint(checkpoint, checkpoint_path)
+            print(f"Checkpoint {txt_path.stem}: {offset:.0f}/{total_seconds:.0f}s")
+
+    # Publish the finished transcript in one step
+    os.replace(segment_partial_path, segment_path)
+    os.replace(partial_path, txt_path)
+    checkpoint_path.unlink(missing_ok=True)
+    print(f"Plain transcript saved to: {txt_path}")
+    return txt_path
@@ -0,0 +1,182 @@
+"""
+Transcribe one long episode in parallel by splitting it into overlapping windows.
+
+Cut points are placed at the quietest frame near each target window boundary,
+every window is padded by `overlap_seconds` on both sides and sent to a pool
+of Whisper workers, and the segments are stitched back into one timeline.
+Each window owns the audio between its two cut points, so a segment from the
+overlap is kept only by the window that owns its midpoint.
+"""
+import multiprocessing as mp
+import re
+from collections import Counter
+
+import numpy as np
+import whisper
+
+from transcribe_podcasts import transcript_path_for, write_transcript
+from vad import frame_energy
+from whisper_pool import init_worker, worker_model
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+
+def find_cut_points(audio, window_seconds=300, search_seconds=15, frame_seconds=0.03):
+    """
+    Sample offsets of the cuts between windows
+
+    Each cut is the quietest frame within +/- search_seconds of the ideal
+    window boundary, so windows end in a pause instead of mid-word.
+    """
+    energy = frame_energy(audio, frame_seconds)
+    frame = int(SAMPLE_RATE * frame_seconds)
+    total_seconds = len(audio) / SAMPLE_RATE
+
+    cuts = [0]
+    target = window_seconds
+    while target < total_seconds - search_seconds:
+        lo = int(max(target - search_seconds, 0) / frame_seconds)
+        hi = int(min(target + search_seconds, total_seconds) / frame_seconds)
+        quietest = lo + int(np.argmin(energy[lo:hi])) if hi > lo else lo
+        cut = quietest * frame + frame // 2
+        if cut > cuts[-1]:
+            cuts.append(cut)
+        target = cut / SAMPLE_RATE + window_seconds
+    cuts.append(len(audio))
+    return cuts
+
+
+def plan_windows(audio, window_seconds=300, overlap_seconds=5, search_seconds=15):
+    """List of (start_sample, end_sample, own_start, own_end) windows"""
+    cuts = find_cut_points(audio, window_seconds, search_seconds)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    windows = []
+    for own_start, own_end in zip(cuts[:-1], cuts[1:]):
+        start = max(own_start - overlap, 0)
+        end = min(own_end + overlap, len(audio))
+        windows.append((start, end, own_start, own_end))
+    return windows
+
+
+def _transcribe_window(job):
+    """Worker job: transcribe one window and shift its segments onto the episode timeline"""
+    audio, offset_seconds, language = job
+    result = worker_model().transcribe(audio, language=language, verbose=None)
+    segments = []
+    for segment in result["segments"]:
+        segment = dict(segment)
+        segment["start"] += offset_seconds
+        segment["end"] += offset_seconds
+        for word in segment.get("words", []):
+            word["start"] += offset_seconds
+            word["end"] += offset_seconds
+        segments.append(segment)
+    return segments
+
+
+def _tokens(text):
+    return re.sub(r"[^a-z0-9 ]", " ", text.lower()).split()
+
+
+def _same_speech(a, b, min_overlap=0.6):
+    """
+    True if segments a and b are two decodes of the same speech
+
+    They must overlap in time, and most of the words of the shorter one must
+    appear in the other (Whisper rarely re-transcribes the overlap verbatim).
+    """
+    if a["start"] >= b["end"] or b["start"] >= a["end"]:
+        return False
+    tokens_a, tokens_b = Counter(_tokens(a["text"])), Counter(_tokens(b["text"]))
+    shorter = min(sum(tokens_a.values()), sum(tokens_b.values()))
+    if shorter == 0:
+        return True
+    return sum((tokens_a & tokens_b).values()) / shorter >= min_overlap
+
+
+def merge_window_segments(windows, window_segments):
+    """
+    Stitch per-window segments into one timeline
+
+    A segment is kept by the window whose owned range contains its midpoint.
+    A segment at the start of a window that repeats one the previous window
+    already kept from the shared overlap (same speech decoded by both with
+    slightly different words and timestamps) is dropped.
+    """
+    merged = []
+    for (start, _, own_start, own_end), segments in zip(windows, window_segments):
+        window_start_s = start / SAMPLE_RATE
+        own_start_s = own_start / SAMPLE_RATE
+        own_end_s = own_end / SAMPLE_RATE
+        # segments kept from the audio this window shares with the previous one
+        shared = [kept for kept in merged if kept["end"] > window_start_s]
+        for segment in segments:
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if not own_start_s <= midpoint < own_end_s:
+                continue
+            if any(_same_speech(segment, kept) for kept in shared):
+                continue
+            if merged and segment["start"] < merged[-1]["end"]:
+                segment["start"] = merged[-1]["end"]
+                segment["end"] = max(segment["end"], segment["start"])
+            merged.append(segment)
+
+    for i, segment in enumerate(merged):
+        segment["id"] = i
+    return merged
+
+
+def transcribe_chunked(audio_path, pool, language="en", window_seconds=300, overlap_seconds=5, audio=None):
+    """Transcribe one file using an existing worker pool and return the merged segments"""
+    if audio is None:
+        audio = whisper.load_audio(str(audio_path))
+    windows = plan_windows(audio, window_seconds, overlap_seconds)
+    print(f"Split {audio_path} into {len(windows)} windows")
+
+    jobs = [(audio[start:end], start / SAMPLE_RATE, language) for start, end, _, _ in windows]
+    window_segments = pool.map(_transcribe_window, jobs)
+    return merge_window_segments(windows, window_segments)
+
+
+def transcribe_files_chunked(audio_files, model_size="base", language="en", workers=2,
+                             torch_threads=1, window_seconds=300, overlap_seconds=5, audio_cache=False,
+                             sha256s=None, on_done=None):
+    """
+    Transcribe files one at a time, each split across `workers` processes
+
+    Latency for a single episode then scales with the worker count. Failures
+    are reported per file and do not stop the batch. With audio_cache the
+    next episodes are decoded in the background (prefetch_audio) while the
+    workers transcribe the current one; sha256s maps str(path) to the digest
+    the manifest already computed. on_done is called with each episode as
+    soon as its transcript is written.
+    """
+    failures = []
+    if not audio_files:
+        return failures
+
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=workers,
+                  initializer=init_worker,
+                  initargs=(model_size, torch_threads)) as pool:
+        if audio_cache:
+            from audio_cache import prefetch_audio
+            decoded = prefetch_audio(audio_files, sha256s=sha256s)
+        else:
+            decoded = ((audio_file, None, None) for audio_file in audio_files)
+
+        for audio_file, audio, decode_error in decoded:
+            print(f"\nProcessing: {audio_file}")
+            try:
+                if decode_error is not None:
+                    raise decode_error
+                segments = transcribe_chunked(audio_file, pool, language, window_seconds, overlap_seconds, audio)
+                txt_path = transcript_path_for(audio_file)
+                write_transcript(segments, txt_path)
+                print(f"Plain transcript saved to: {txt_path}")
+                if on_done is not None:
+                    on_done(audio_file)
+            except Exception as e:
+                print(f"Error processing {audio_file}: {e}")
+                failures.append((str(audio_file), str(e)))
+    return failures
@@ -1,6 +1,11 @@
+import json
 import os
 import re
 import string
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from segment_store import has_segments, iter_segments
 
 
 # ------------------------------------------------------------------------------
@@ -9,22 +14,58 @@ import string
 
 FILLER_WORDS = ["um", "uh", "like", "ah", "er", "yeah", "good", "oh", "yes", "bye"]
 
+# compiled once instead of on every line; the filler pattern runs after lowercasing
+# and character filtering, so it no longer needs re.IGNORECASE
+TIMESTAMP_PATTERN = re.compile(r"\[.*?\]")
+FILLER_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in FILLER_WORDS) + r')\b')
+ALLOWED_CHARS = set(string.ascii_lowercase + string.digits + ",.?!'-")
+
+
+class _AllowedCharTable(dict):
+    """
+    str.translate table that deletes everything outside [a-z0-9,.?!'\\-\\s]
+
+    Entries are filled in on first sight of a character, so unicode input
+    costs one lookup per distinct character. \\s in a str regex is the same
+    test as str.isspace().
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        self[codepoint] = codepoint if char in ALLOWED_CHARS or char.isspace() else None
+        return self[codepoint]
+
+
+ALLOWED_CHAR_TABLE = _AllowedCharTable()
+
+
+def clean_text(text: str) -> list:
+    """
+    Clean a block of transcript lines in one go and return the cleaned lines
+
+    Every step works line by line, so running it over many lines joined with
+    "\\n" gives exactly what clean_line gives for each of them.
+    """
+    text = TIMESTAMP_PATTERN.sub("", text).lower().translate(ALLOWED_CHAR_TABLE)
+    text = FILLER_PATTERN.sub("", text)
+    return [" ".join(line.split()) for line in text.split("\n")]
+
 
 def clean_line(line: str) -> str:
-   
-    line_no_timestamps = re.sub(r"\[.*?\]", "", line)
-    allowed_chars = r"[^a-z0-9,.?!'\-\s]"
-    line_clean_punct = re.sub(allowed_chars, "", line_no_timestamps.lower())
-    
-    filler_pattern = r'\b(?:' + '|'.join(re.escape(word) for word in FILLER_WORDS) + r')\b'
-    
-    line_no_fillers = re.sub(filler_pattern, '', line_clean_punct, flags=re.IGNORECASE)
+    return " ".join(cleaned for cleaned in clean_text(line) if cleaned)
 
-    tokens = line_no_fillers.split()
 
-    line_final = " ".join(tokens)
-    
-    return line_final
+def clean_lines(lines, block_size=2000):
+    """Stream lines through clean_text in blocks and yield the non-empty results"""
+    lines = iter(lines)
+    while True:
+        block = list(islice(lines, block_size))
+        if not block:
+            return
+        text = "".join(line if line.endswith("\n") else line + "\n" for line in block)
+        for cleaned_line in clean_text(text):
+            if cleaned_line:
+                yield cleaned_line
 
 # ------------------------------------------------------------------------------
 # try to combine and segment for each episode
@@ -40,26 +81,146 @@ def segment_transcript(cleaned_lines, chunk_size=5):
     return segments
 
 
-input_folder = "transcripts"
-output_folder = "cleaned_transcripts"
-
-for filename in os.listdir(input_folder):
+# ------------------------------------------------------------------------------
+# token-budgeted chunks that keep their timestamps
+# ------------------------------------------------------------------------------
+# match the RAG scripts' Settings.chunk_size / chunk_overlap so LlamaIndex
+# does not have to split the chunks again
+CHUNK_TOKENS = 600
+CHUNK_OVERLAP_TOKENS = 50
+
+TIMED_LINE_PATTERN = re.compile(r"^\[(\d+):(\d\d):(\d\d) --> (\d+):(\d\d):(\d\d)\]")
+
+
+def format_seconds(seconds):
+    """HH:MM:SS like the transcript timestamps"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def token_counter():
+    """
+    Count tokens with the cl100k_base tokenizer (ada-002 and gpt-3.5), or
+    estimate from words when tiktoken or its encoding file is unavailable
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return lambda text: int(len(text.split()) * 4 / 3) + 1
+    return lambda text: len(encoding.encode(text))
+
+
+def read_timed_lines(input_path, episode_id):
+    """Return (start, end, cleaned_text) for every non-empty line of one episode"""
+    timed_lines = []
+    if has_segments(episode_id):
+        for segment in iter_segments(episode_id):
+            timed_lines.append((segment["start"], segment["end"], clean_line(segment["text"])))
+    else:
+        with open(input_path, "r", encoding="utf-8") as infile:
+            for line in infile:
+                match = TIMED_LINE_PATTERN.match(line)
+                if not match:
+                    continue
+                h1, m1, s1, h2, m2, s2 = (int(part) for part in match.groups())
+                timed_lines.append((h1 * 3600 + m1 * 60 + s1, h2 * 3600 + m2 * 60 + s2, clean_line(line)))
+    return [timed_line for timed_line in timed_lines if timed_line[2]]
+
+
+def segment_by_tokens(timed_lines, episode_id, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                      count_tokens=None):
+    """
+    Pack timed lines into chunks of at most max_tokens
+
+    Consecutive chunks share up to overlap_tokens worth of trailing lines. Each
+    chunk keeps episode_id and the start/end seconds of its first and last
+    line, so a retrieval hit can be played back from the audio. A single line
+    longer than the budget becomes a chunk of its own.
+    """
+    count_tokens = count_tokens or token_counter()
+    sizes = [count_tokens(text) for _, _, text in timed_lines]
+
+    chunks = []
+    first = 0
+    while first < len(timed_lines):
+        last = first
+        total = sizes[first]
+        while last + 1 < len(timed_lines) and total + sizes[last + 1] + 1 <= max_tokens:
+            last += 1
+            total += sizes[last] + 1
+        chunks.append({
+            "episode_id": episode_id,
+            "chunk_id": len(chunks),
+            "start": timed_lines[first][0],
+            "end": timed_lines[last][1],
+            "text": " ".join(text for _, _, text in timed_lines[first:last + 1]),
+            "n_tokens": total,
+        })
+        if last + 1 >= len(timed_lines):
+            break
+        # step back over trailing lines that fit in the overlap
+        next_first = last + 1
+        overlap = 0
+        while next_first - 1 > first and overlap + sizes[next_first - 1] <= overlap_tokens:
+            next_first -= 1
+            overlap += sizes[next_first]
+        first = next_first
+    return chunks
+
+
+def write_chunks(chunks, chunk_path):
+    with open(chunk_path, "w", encoding="utf-8") as outfile:
+        for chunk in chunks:
+            outfile.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+
+
+def load_chunks(chunk_folder="cleaned_transcripts"):
+    """All timestamped chunks written by clean_corpus"""
+    chunks = []
+    for filename in sorted(os.listdir(chunk_folder)):
+        if filename.endswith("_chunks.jsonl"):
+            with open(os.path.join(chunk_folder, filename), "r", encoding="utf-8") as f:
+                chunks.extend(json.loads(line) for line in f)
+    return chunks
+
+
+def clean_file(input_path, output_path):
+    """Clean and segment one transcript; reads the segment store when it exists"""
+    episode_id = os.path.splitext(os.path.basename(input_path))[0]
+    if has_segments(episode_id):
+        # structured segments skip the timestamp parsing; clean_text still drops [Music] etc.
+        cleaned_lines = [clean_line(segment["text"]) for segment in iter_segments(episode_id)]
+        cleaned_lines = [cleaned_line for cleaned_line in cleaned_lines if cleaned_line]
+    else:
+        with open(input_path, "r", encoding="utf-8") as infile:
+            cleaned_lines = list(clean_lines(infile))
+
+    segments = segment_transcript(cleaned_lines, chunk_size=5)
+
+    with open(output_path, "w", encoding="utf-8") as outfile:
+        for segment in segments:
+            outfile.write(segment + "\n\n")
+
+    # timestamped, token-budgeted chunks for the RAG scripts
+    chunk_path = output_path.replace(".txt", "_chunks.jsonl")
+    write_chunks(segment_by_tokens(read_timed_lines(input_path, episode_id), episode_id), chunk_path)
+    return output_path
+
+
+def clean_corpus(input_folder="transcripts", output_folder="cleaned_transcripts", workers=None):
+    """Clean every *_2025.txt transcript, spreading the files over a process pool"""
+    jobs = []
+    for filename in os.listdir(input_folder):
         if filename.endswith("_2025.txt"):
-             input_path = os.path.join(input_folder, filename)
-             output_path = os.path.join(output_folder, filename.replace("_2025.txt", "_2025_cleaned.txt"))
-
-             cleaned_lines = []  
-             with open(input_path, "r", encoding="utf-8") as infile:
-                for line in infile:
-                     cleaned_line = clean_line(line)
-                     if cleaned_line.strip(): 
-                          cleaned_lines.append(cleaned_line)
-
-             segments = segment_transcript(cleaned_lines, chunk_size=5)  
+            input_path = os.path.join(input_folder, filename)
+            output_path = os.path.join(output_folder, filename.replace("_2025.txt", "_2025_cleaned.txt"))
+            jobs.append((input_path, output_path))
 
-             with open(output_path, "w", encoding="utf-8") as outfile:
-                  for segment in segments:
-                       outfile.write(segment + "\n\n")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(clean_file, *zip(*jobs))) if jobs else []
 
-print("Separate cleaned and segmented files created for each podcast episode.")
 
+if __name__ == "__main__":
+    clean_corpus()
+    print("Separate cleaned and segmented files created for each podcast episode.")
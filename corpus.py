@@ -0,0 +1,70 @@
+"""
+Append-only JSONL corpus of enriched transcripts.
+
+enriched_transcripts.jsonl holds one episode record per line, in the same
+shape add_metadata_to_transcripts.py used to dump into the monolithic
+enriched_transcripts.json. New episodes are appended as single lines and
+readers iterate records lazily instead of json.load-ing the whole corpus.
+"""
+import json
+import os
+
+CORPUS_PATH = "enriched_transcripts.jsonl"
+LEGACY_CORPUS_PATH = "enriched_transcripts.json"
+
+
+def iter_records(path=CORPUS_PATH):
+    """Yield corpus records one at a time"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def corpus_ids(path=CORPUS_PATH):
+    """ids of the episodes already in the corpus"""
+    return {record["id"] for record in iter_records(path)}
+
+
+def append_records(records, path=CORPUS_PATH):
+    """Append records as JSON lines; returns how many were written"""
+    written = 0
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+    return written
+
+
+def rewrite_corpus(records, path=CORPUS_PATH):
+    """Replace the whole corpus, e.g. after episode texts changed"""
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    append_records(records, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def migrate_legacy_corpus(path=CORPUS_PATH, legacy_path=LEGACY_CORPUS_PATH):
+    """Convert an old enriched_transcripts.json into the JSONL corpus once"""
+    if os.path.exists(path) or not os.path.exists(legacy_path):
+        return False
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        rewrite_corpus(json.load(f), path)
+    return True
+
+
+def iter_documents(path=CORPUS_PATH):
+    """Lazily yield a LlamaIndex Document per episode"""
+    from llama_index.core import Document
+
+    for record in iter_records(path):
+        metadata = {
+            "id": record["id"],
+            "title": record["title"],
+            "date": record["date"],
+            **record.get("metadata", {}),
+        }
+        yield Document(text=record["text"], metadata=metadata, id_=record["id"])
@@ -0,0 +1,254 @@
+"""
+Content-addressed embedding cache shared by topic modeling and RAG.
+
+Vectors live in embedding_cache/<model>/vectors.f32, a float32 matrix that
+is memory-mapped on read, with the sha256 of each text in keys.txt (row i
+of the matrix belongs to line i). Only texts that are not in the cache yet
+are sent to the backend, in batches of `batch_size`, and appended to both
+files, so a re-run only embeds new text.
+
+Backends:
+    SentenceTransformerBackend("sentence-transformers/all-mpnet-base-v2")  local, CPU, offline
+    OpenAIBackend("text-embedding-ada-002")                               OpenAI embeddings API
+
+Adapters:
+    CachedEmbedding(cache)   LlamaIndex embed model for Settings.embed_model
+    BERTopicEmbedder(cache)  BERTopic embedding_model
+
+Query strings are not corpus text: CachedEmbedding embeds them through
+EmbeddingCache.lookup(), which reads cached rows but does not store new ones,
+and keeps recent query vectors in memory instead. BERTopicEmbedder does the
+same for what BERTopic embeds on its own (topic words and representative
+strings); callers embed their segments with EmbeddingCache.embed() and pass
+the vectors to fit/partial_fit.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_DIR = "embedding_cache"
+LOCAL_MODEL = "sentence-transformers/all-mpnet-base-v2"
+OPENAI_MODEL = "text-embedding-ada-002"
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_slug(model_name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+class SentenceTransformerBackend:
+    def __init__(self, model_name=LOCAL_MODEL, device="cpu", encode_batch_size=64):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.encode_batch_size = encode_batch_size
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def embed(self, texts):
+        return self.model.encode(texts, batch_size=self.encode_batch_size, convert_to_numpy=True)
+
+
+class OpenAIBackend:
+    def __init__(self, model_name=OPENAI_MODEL, client=None):
+        from openai import OpenAI
+
+        self.model_name = model_name
+        self.client = client or OpenAI()
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model_name, input=texts)
+        return np.array([item.embedding for item in sorted(response.data, key=lambda item: item.index)])
+
+
+class EmbeddingCache:
+    def __init__(self, backend, cache_dir=CACHE_DIR, batch_size=256):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.batch_size = batch_size
+        self.folder = os.path.join(cache_dir, model_slug(self.model_name))
+        self.keys_path = os.path.join(self.folder, "keys.txt")
+        self.vectors_path = os.path.join(self.folder, "vectors.f32")
+        self.meta_path = os.path.join(self.folder, "meta.json")
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self.lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        keys = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = [line.strip() for line in f if line.strip()]
+        # vectors are appended before their keys, so an interrupted append leaves
+        # at most some unreferenced rows at the end of the matrix
+        stored_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if self.dim else 0
+        self.rows = {key: row for row, key in enumerate(keys[:stored_rows])}
+        self.row_count = len(keys[:stored_rows])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, text):
+        return text_key(text) in self.rows
+
+    @property
+    def vectors(self):
+        """Memory-mapped (rows, dim) matrix of every cached vector"""
+        if self._vectors is None or self._vectors.shape[0] != self.row_count:
+            if not self.row_count:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                      shape=(self.row_count, self.dim))
+        return self._vectors
+
+    def _append(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        # drop rows left behind by an interrupted append before writing new ones
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(self.row_count * self.dim * 4)
+            f.write(vectors.tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write("".join(key + "\n" for key in keys))
+        for key in keys:
+            self.rows[key] = self.row_count
+            self.row_count += 1
+
+    def embed(self, texts, show_progress=False):
+        """(len(texts), dim) float32 array; cache misses are embedded in batches"""
+        # one writer at a time, e.g. concurrent queries in query_server.py
+        with self.lock:
+            return self._embed(list(texts), show_progress)
+
+    def _embed(self, texts, show_progress):
+        keys = [text_key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.rows and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            self._append(batch_keys, self.backend.embed([missing[key] for key in batch_keys]))
+            if show_progress:
+                print(f"Embedded {min(start + self.batch_size, len(missing_keys))}/{len(missing_keys)} new texts")
+
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors[[self.rows[key] for key in keys]])
+
+    def lookup(self, texts):
+        """Like embed(), but texts that are not cached yet are embedded without being stored"""
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+        with self.lock:
+            cached = {key: np.array(self.vectors[self.rows[key]]) for key in keys if key in self.rows}
+            hits = sum(key in cached for key in keys)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            cached.update(zip(missing, np.asarray(self.backend.embed(list(missing.values())), dtype=np.float32)))
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.array([cached[key] for key in keys], dtype=np.float32)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.rows), "model": self.model_name}
+
+
+def default_embedding_cache(backend=None):
+    """Cache for the backend named by EMBEDDING_BACKEND ("openai" or "local"), OpenAI by default"""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "openai")
+    if backend == "local":
+        return EmbeddingCache(SentenceTransformerBackend())
+    return EmbeddingCache(OpenAIBackend())
+
+
+try:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from llama_index.core.bridge.pydantic import PrivateAttr
+except ImportError:
+    BaseEmbedding = None
+
+if BaseEmbedding is not None:
+    class CachedEmbedding(BaseEmbedding):
+        """LlamaIndex embed model backed by an EmbeddingCache"""
+
+        _cache: EmbeddingCache = PrivateAttr()
+        _query_vectors: OrderedDict = PrivateAttr()
+        _query_cache_size: int = PrivateAttr()
+        _query_lock: threading.Lock = PrivateAttr()
+
+        def __init__(self, cache, query_cache_size=1024, **kwargs):
+            kwargs.setdefault("embed_batch_size", cache.batch_size)
+            super().__init__(model_name=cache.model_name, **kwargs)
+            self._cache = cache
+            # queries stay out of the on-disk cache; recent ones are kept here
+            self._query_vectors = OrderedDict()
+            self._query_cache_size = query_cache_size
+            self._query_lock = threading.Lock()
+
+        @property
+        def cache(self):
+            return self._cache
+
+        def _get_query_embedding(self, query):
+            with self._query_lock:
+                if query in self._query_vectors:
+                    self._query_vectors.move_to_end(query)
+                    return self._query_vectors[query]
+            vector = self._cache.lookup([query])[0].tolist()
+            with self._query_lock:
+                self._query_vectors[query] = vector
+                if len(self._query_vectors) > self._query_cache_size:
+                    self._query_vectors.popitem(last=False)
+            return vector
+
+        def _get_text_embedding(self, text):
+            return self._cache.embed([text])[0].tolist()
+
+        def _get_text_embeddings(self, texts):
+            return self._cache.embed(texts).tolist()
+
+        async def _aget_query_embedding(self, query):
+            return self._get_query_embedding(query)
+
+        async def _aget_text_embedding(self, text):
+            return self._get_text_embedding(text)
+
+try:
+    from bertopic.backend import BaseEmbedder
+except ImportError:
+    BaseEmbedder = None
+
+if BaseEmbedder is not None:
+    class BERTopicEmbedder(BaseEmbedder):
+        """BERTopic embedding backend that reads from an EmbeddingCache without adding to it"""
+
+        def __init__(self, cache):
+            super().__init__()
+            self.cache = cache
+
+        def embed(self, documents, verbose=False):
+            return self.cache.lookup(documents)
@@ -4,9 +4,11 @@
 
 import os
 from dotenv import load_dotenv
-from llama_index.core import Document, VectorStoreIndex, Settings
-from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.core import Document, Settings
+from clean_episodes import load_chunks, format_seconds
+from llm_cache import CachedLlamaOpenAI
+from embedding_cache import CachedEmbedding, default_embedding_cache, text_key
+from rag_index import load_or_build_index
 
 # Load environment variables
 load_dotenv()
@@ -23,23 +25,50 @@ with open(file_path, "r", encoding="utf-8") as f:
 
 print(f"Number of segments: {len(segments)}")
 
-# Create Document objects
-docs = [Document(text=seg) for seg in segments]
+# Create Document objects. Ids are content hashes rather than positions, so
+# inserting or removing a segment does not make every later one look changed
+# when the persisted index is synced (repeated segments become one document)
+docs = [Document(text=seg, id_=text_key(f"{input_file}\0{seg}")) for seg in dict.fromkeys(segments)]
 
 # Set up LLM and embedding model
-llm = OpenAI(model="gpt-3.5-turbo", api_key=api_key, temperature=0)
-embed_model = OpenAIEmbedding(model="text-embedding-ada-002", api_key=api_key)
+llm = CachedLlamaOpenAI(model="gpt-3.5-turbo", api_key=api_key, temperature=0)
+# text-embedding-ada-002 through embedding_cache/ (EMBEDDING_BACKEND=local for the
+# offline sentence-transformers model that bertopic_explore.py uses)
+embed_model = CachedEmbedding(default_embedding_cache())
 
 # Configure global settings
 Settings.llm = llm
 Settings.embed_model = embed_model
 
-# Create the index
-index = VectorStoreIndex.from_documents(docs)
+# Prefer the timestamped, token-budgeted chunks from clean_episodes.py: they are
+# already sized for the embedding model, so each one is a single node
+chunks = load_chunks(input_folder)
+if chunks:
+    print(f"Number of timestamped chunks: {len(chunks)}")
+    # content-hash ids, like the segment documents above
+    chunk_docs = [
+        Document(
+            text=chunk["text"],
+            id_=text_key(f"{chunk['episode_id']}\0{chunk['text']}"),
+            metadata={"episode_id": chunk["episode_id"], "start": chunk["start"], "end": chunk["end"]},
+            excluded_embed_metadata_keys=["episode_id", "start", "end"],
+        )
+        for chunk in chunks
+    ]
+    # loaded from storage/explore_chunks; only new or changed chunks are embedded
+    index = load_or_build_index(chunk_docs, name="explore_chunks")
+else:
+    # Create the index
+    index = load_or_build_index(docs, name="explore_segments")
 
-# 6. Build a query engine
+# 6. Build a query engine (repeated questions are answered from .llm_cache.sqlite)
 query_engine = index.as_query_engine()
 
 # 7. Query
 response = query_engine.query("What does the text say about masa?")
-print(response.response)
\ No newline at end of file
+print(response.response)
+
+# Where in the audio each hit came from
+for source in response.source_nodes:
+    if "episode_id" in source.metadata:
+        print(f"{source.metadata['episode_id']} @ {format_seconds(source.metadata['start'])}")
\ No newline at end of file
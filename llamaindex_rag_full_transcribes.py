@@ -1,25 +1,28 @@
 # try build RAG pipeline using llamaindex on all 13 transcripts
 # 1. this below version is from OpenAI's o3-mini-high. It uses GPTVectorStoreIndex for LLM integration 
-import json
-from llama_index.core import Document, GPTVectorStoreIndex
-
-with open('enriched_transcripts.json', 'r', encoding='utf-8') as f:
-    transcripts = json.load(f)
-
-docs = []
-for entry in transcripts:
-    content = entry.get("text", "")
-    extra_info = {
-        "id": entry.get("id"),
-        "title": entry.get("title"),
-        "date": entry.get("date"),
-        **entry.get("metadata", {})
-    }
-    docs. append(Document(text=content, extra_info=extra_info))
+from llama_index.core import Settings
+from corpus import iter_documents
+from llm_cache import CachedLlamaOpenAI
+from embedding_cache import CachedEmbedding, default_embedding_cache
+from rag_index import load_or_build_index
+
+# same model and temperature as the LlamaIndex default, but cached on disk
+Settings.llm = CachedLlamaOpenAI(model="gpt-3.5-turbo", temperature=0.1)
+# the LlamaIndex default embedding model, with vectors cached in embedding_cache/
+Settings.embed_model = CachedEmbedding(default_embedding_cache())
+
+# Configure LlamaIndex settings (used for both parts below)
+Settings.chunk_size = 600
+Settings.chunk_overlap = 50
+
+# records are streamed from the JSONL corpus one at a time
+docs = list(iter_documents())
 
 print(f"Loaded {len(docs)} docu0ments.")
 
-index = GPTVectorStoreIndex.from_documents(docs)
+# one index for the whole script, persisted in storage/episodes; episodes are
+# keyed by id, so only new or changed ones are re-embedded on the next run
+index = load_or_build_index(docs, name="episodes")
 
 query_str = "What are the main trends related to coffee?"
 
@@ -31,59 +34,26 @@ print(response)
 # not sure where to improve yet, but the response is not very interesting. no real contents.
 
 # 2. below is from claude 3.5 
-from typing import List
-import json
-from llama_index.core import Document, VectorStoreIndex, Settings
-from llama_index.core.node_parser import SimpleNodeParser
-from llama_index.core.postprocessor import SimilarityPostprocessor, KeywordNodePostprocessor
-from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.response_synthesizers import get_response_synthesizer
 from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.llms.openai import OpenAI
-
-# Function to load and process JSON data
-def load_podcast_data(file_path: str) -> List[Document]:
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-    
-    documents = []
-    for episode in data:
-        # Create metadata dictionary
-        metadata = {
-            'id': episode['id'],
-            'title': episode['title'],
-            'date': episode['date'],
-            'source': episode['metadata']['source']
-        }
-        
-        # Create Document object
-        doc = Document(
-            text=episode['text'],
-            metadata=metadata
-        )
-        documents.append(doc)
-    
-    return documents
-
-# Configure LlamaIndex settings
-Settings.chunk_size = 600
-Settings.chunk_overlap = 50
+from local_vector_store import LocalVectorRetriever
+from bm25_index import HybridRetriever
 
-# Load documents
-documents = load_podcast_data('enriched_transcripts.json')
+# Reuse the index from part 1 instead of embedding the same episodes again
+vector_index = index
 
-# Create parser and index
-node_parser = SimpleNodeParser.from_defaults()
-nodes = node_parser.get_nodes_from_documents(documents)
-vector_index = VectorStoreIndex(nodes)
+# Create retriever over an in-memory matrix of the index's nodes (vectors come
+# from embedding_cache/, so nothing is re-embedded); metadata filters are
+# applied before scoring
+vector_retriever = LocalVectorRetriever.from_index(vector_index, similarity_top_k=3)
 
-# Create retriever with similarity threshold
-retriever = VectorIndexRetriever(
-    index=vector_index,
-    similarity_top_k=3
-)
+# BM25 over the same nodes, fused with the vector ranking. This replaces
+# KeywordNodePostprocessor(required_keywords=["food", "trend"]), which ran after
+# the top 3 had been picked and usually filtered all of them out. Short keyword
+# queries ("masa") are answered from the keyword index without an embedding call
+retriever = HybridRetriever(vector_retriever, similarity_top_k=3)
 
-llm = OpenAI(model="gpt-4", temperature=0)
+llm = CachedLlamaOpenAI(model="gpt-4", temperature=0)
 
 # Create a response synthesizer with specific parameters
 response_synthesizer = get_response_synthesizer(
@@ -92,14 +62,11 @@ response_synthesizer = get_response_synthesizer(
     verbose=True
 )
 
-# Create query engine with post-processing
+# Create query engine (fused scores are ranks, not cosine similarities, so
+# there is no similarity cutoff)
 query_engine = RetrieverQueryEngine(
     retriever=retriever,
-    response_synthesizer=response_synthesizer,
-    node_postprocessors=[
-        SimilarityPostprocessor(similarity_cutoff=0.7),
-        KeywordNodePostprocessor(required_keywords=["food", "trend"]),
-    ]
+    response_synthesizer=response_synthesizer
 )
 # Example query
 response = query_engine.query(
@@ -107,9 +74,13 @@ response = query_engine.query(
 )
 print(response)
 
-# Query with metadata filtering
-response = query_engine.query(
-    "What were the key topics discussed in 2025?",
-    filters={"date": "2025-01-19"}
+# Query with metadata filtering: query() has no filters argument, so the
+# filter goes on the retriever (dates come from the episode file names)
+dated_query_engine = RetrieverQueryEngine(
+    retriever=retriever.filtered(date_range=("2025-01-01", "2025-12-31")),
+    response_synthesizer=response_synthesizer
+)
+response = dated_query_engine.query(
+    "What were the key topics discussed in 2025?"
 )
 print(response)
@@ -0,0 +1,199 @@
+"""
+Disk-backed cache for deterministic LLM calls.
+
+Responses are stored in a local SQLite file keyed by a hash of the model,
+messages, temperature and max_tokens. Only calls at or below
+`max_temperature` are cached (the scripts use 0 and 0.1), entries expire
+after `ttl_seconds`, and the least recently used entries are evicted once
+the stored responses exceed `max_bytes`.
+
+Two entry points share one cache file:
+    CachedOpenAI(OpenAI()) / CachedOpenAI(AsyncOpenAI())  for the raw client
+    CachedLlamaOpenAI(model=..., temperature=0)           for Settings.llm
+"""
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = ".llm_cache.sqlite"
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=200 * 1024 * 1024, ttl_seconds=30 * 24 * 3600,
+                 max_temperature=0.1):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens, **extra):
+        payload = {"model": model, "messages": messages, "temperature": temperature,
+                   "max_tokens": max_tokens, **extra}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def cacheable(self, temperature, stream=False, n=1):
+        """Only deterministic, single-choice, non-streaming calls are worth caching"""
+        if stream or (n or 1) != 1:
+            return False
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response), now, now),
+            )
+            self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now):
+        self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+class _CachedCompletions:
+    def __init__(self, completions, cache):
+        self._completions = completions
+        self._cache = cache
+        # AsyncCompletions.create is wrapped by a plain decorator, so look underneath it
+        self._is_async = inspect.iscoroutinefunction(inspect.unwrap(completions.create))
+
+    def _key(self, kwargs):
+        extra = {k: v for k, v in kwargs.items() if k not in ("model", "messages", "temperature", "max_tokens")}
+        return self._cache.make_key(kwargs.get("model"), kwargs.get("messages"), kwargs.get("temperature"),
+                                    kwargs.get("max_tokens"), **extra)
+
+    def create(self, **kwargs):
+        if self._is_async:
+            return self._acreate(**kwargs)
+        if not self._cache.cacheable(kwargs.get("temperature"), kwargs.get("stream"), kwargs.get("n")):
+            return self._completions.create(**kwargs)
+
+        from openai.types.chat import ChatCompletion
+
+        key = self._key(kwargs)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+        response = self._completions.create(**kwargs)
+        self._cache.put(key, kwargs.get("model"), response.model_dump_json())
+        return response
+
+    async def _acreate(self, **kwargs):
+        if not self._cache.cacheable(kwargs.get("temperature"), kwargs.get("stream"), kwargs.get("n")):
+            return await self._completions.create(**kwargs)
+
+        from openai.types.chat import ChatCompletion
+
+        key = self._key(kwargs)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+        response = await self._completions.create(**kwargs)
+        self._cache.put(key, kwargs.get("model"), response.model_dump_json())
+        return response
+
+
+class _CachedChat:
+    def __init__(self, chat, cache):
+        self.completions = _CachedCompletions(chat.completions, cache)
+
+
+class CachedOpenAI:
+    """Wraps an OpenAI or AsyncOpenAI client so chat.completions.create goes through the cache"""
+
+    def __init__(self, client, cache=None):
+        self._client = client
+        self.cache = cache or ResponseCache()
+        self.chat = _CachedChat(client.chat, self.cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+try:
+    from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse, MessageRole
+    from llama_index.core.bridge.pydantic import PrivateAttr
+    from llama_index.llms.openai import OpenAI as LlamaOpenAI
+except ImportError:
+    LlamaOpenAI = None
+
+if LlamaOpenAI is not None:
+    class CachedLlamaOpenAI(LlamaOpenAI):
+        """LlamaIndex OpenAI LLM whose chat/complete calls go through the cache"""
+
+        _cache: ResponseCache = PrivateAttr()
+
+        def __init__(self, *args, cache=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._cache = cache or ResponseCache()
+
+        @property
+        def cache(self):
+            return self._cache
+
+        def _cache_key(self, messages, kwargs):
+            return self._cache.make_key(self.model, messages, self.temperature, self.max_tokens,
+                                        additional_kwargs=self.additional_kwargs, **kwargs)
+
+        def chat(self, messages, **kwargs):
+            if not self._cache.cacheable(self.temperature):
+                return super().chat(messages, **kwargs)
+            key = self._cache_key([{"role": m.role.value, "content": m.content} for m in messages], kwargs)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=cached))
+            response = super().chat(messages, **kwargs)
+            self._cache.put(key, self.model, response.message.content or "")
+            return response
+
+        def complete(self, prompt, formatted=False, **kwargs):
+            if not self._cache.cacheable(self.temperature):
+                return super().complete(prompt, formatted=formatted, **kwargs)
+            key = self._cache_key([{"role": "user", "content": prompt, "formatted": formatted}], kwargs)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return CompletionResponse(text=cached)
+            response = super().complete(prompt, formatted=formatted, **kwargs)
+            self._cache.put(key, self.model, response.text)
+            return response
@@ -0,0 +1,200 @@
+"""
+In-process vector store with metadata pre-filtering.
+
+All embeddings sit in one contiguous, L2-normalised float32 matrix, so a
+query is a single matrix-vector product followed by an argpartition top-k.
+Metadata filters are resolved to boolean bitmaps (one per field value,
+built on first use and cached) and a datetime64 column for date ranges;
+they are combined before scoring, so only the matching rows are scored.
+
+Above `ann_threshold` rows an approximate nearest-neighbour graph
+(pynndescent, already installed with UMAP) answers unfiltered queries and
+filtered queries whose candidate set is still large; small candidate sets are
+always scored exactly.
+
+LocalVectorRetriever plugs the store into RetrieverQueryEngine:
+
+    retriever = LocalVectorRetriever.from_index(index, similarity_top_k=3)
+    dated = retriever.filtered(date_range=("2025-01-01", "2025-01-31"))
+    RetrieverQueryEngine(retriever=dated, response_synthesizer=...)
+"""
+import numpy as np
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+class LocalVectorStore:
+    def __init__(self, embeddings, metadata, ids=None, ann_threshold=50_000, date_field="date"):
+        self.matrix = normalize_rows(embeddings)
+        self.metadata = list(metadata)
+        self.ids = list(ids) if ids is not None else list(range(len(self.metadata)))
+        self.ann_threshold = ann_threshold
+        self.date_field = date_field
+        self._bitmaps = {}
+        self._dates = None
+        self._ann = None
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _field_index(self, field):
+        """value -> bitmap of the rows that have it"""
+        if field not in self._bitmaps:
+            rows_by_value = {}
+            for row, metadata in enumerate(self.metadata):
+                value = metadata.get(field)
+                if value is not None:
+                    rows_by_value.setdefault(value, []).append(row)
+            bitmaps = {}
+            for value, rows in rows_by_value.items():
+                bitmap = np.zeros(len(self), dtype=bool)
+                bitmap[rows] = True
+                bitmaps[value] = bitmap
+            self._bitmaps[field] = bitmaps
+        return self._bitmaps[field]
+
+    @property
+    def dates(self):
+        if self._dates is None:
+            self._dates = np.array([metadata.get(self.date_field) or "NaT" for metadata in self.metadata],
+                                   dtype="datetime64[D]")
+        return self._dates
+
+    def filter_mask(self, where=None, date_range=None):
+        """
+        Bitmap of rows matching every condition, or None for no filter.
+        `where` maps a metadata field to a value or a list of accepted values;
+        `date_range` is an inclusive (start, end) pair of ISO dates, either may be None.
+        """
+        mask = None
+        for field, accepted in (where or {}).items():
+            if not isinstance(accepted, (list, tuple, set, frozenset)):
+                accepted = [accepted]
+            index = self._field_index(field)
+            field_mask = np.zeros(len(self), dtype=bool)
+            for value in accepted:
+                if value in index:
+                    field_mask |= index[value]
+            mask = field_mask if mask is None else mask & field_mask
+        if date_range is not None:
+            start, end = date_range
+            date_mask = ~np.isnat(self.dates)
+            if start is not None:
+                date_mask &= self.dates >= np.datetime64(start, "D")
+            if end is not None:
+                date_mask &= self.dates <= np.datetime64(end, "D")
+            mask = date_mask if mask is None else mask & date_mask
+        return mask
+
+    def _ann_index(self):
+        if self._ann is None:
+            from pynndescent import NNDescent
+
+            self._ann = NNDescent(self.matrix, metric="cosine", n_neighbors=30, random_state=42)
+            self._ann.prepare()
+        return self._ann
+
+    def _exact(self, query, k, rows=None):
+        if rows is None:
+            return top_k(self.matrix @ query, k)
+        return rows[top_k(self.matrix[rows] @ query, k)]
+
+    def _approximate(self, query, k, mask=None):
+        # widen the ANN search until enough neighbours pass the filter
+        fetch = k if mask is None else 4 * k
+        while True:
+            fetch = min(fetch, len(self))
+            neighbours = self._ann_index().query(query[None, :], k=fetch)[0][0]
+            if mask is not None:
+                neighbours = neighbours[mask[neighbours]]
+            if len(neighbours) >= k or fetch == len(self):
+                return neighbours[:k]
+            fetch *= 4
+
+    def search(self, query_embedding, k=10, where=None, date_range=None):
+        """[(id, score, metadata)] of the k most similar rows that pass the filters"""
+        query = normalize_rows(np.asarray(query_embedding)[None, :])[0]
+        mask = self.filter_mask(where, date_range)
+        candidates = None if mask is None else np.flatnonzero(mask)
+
+        candidate_count = len(self) if candidates is None else len(candidates)
+        if candidate_count < self.ann_threshold:
+            rows = self._exact(query, k, candidates)
+        else:
+            rows = self._approximate(query, k, mask)
+        scores = self.matrix[rows] @ query
+        order = np.argsort(-scores)
+        return [(self.ids[rows[i]], float(scores[i]), self.metadata[rows[i]]) for i in order]
+
+
+try:
+    from llama_index.core import QueryBundle
+    from llama_index.core.retrievers import BaseRetriever
+    from llama_index.core.schema import MetadataMode, NodeWithScore
+except ImportError:
+    BaseRetriever = None
+
+if BaseRetriever is not None:
+    class LocalVectorRetriever(BaseRetriever):
+        """LlamaIndex retriever over a LocalVectorStore, with optional pre-filters"""
+
+        def __init__(self, store, nodes, embed_model, similarity_top_k=3, where=None, date_range=None):
+            super().__init__()
+            self.store = store
+            self.nodes = nodes
+            self.embed_model = embed_model
+            self.similarity_top_k = similarity_top_k
+            self.where = where
+            self.date_range = date_range
+
+        @classmethod
+        def from_nodes(cls, nodes, embed_model, similarity_top_k=3, stored_embeddings=None, **store_kwargs):
+            """
+            Build over nodes; vectors found in stored_embeddings (node_id -> vector)
+            are reused and only the remaining nodes go through embed_model
+            """
+            nodes = list(nodes)
+            stored_embeddings = stored_embeddings or {}
+            missing = [node for node in nodes if node.node_id not in stored_embeddings]
+            embedded = dict(zip(
+                (node.node_id for node in missing),
+                embed_model.get_text_embedding_batch(
+                    [node.get_content(metadata_mode=MetadataMode.EMBED) for node in missing]
+                ) if missing else [],
+            ))
+            embeddings = [stored_embeddings.get(node.node_id) or embedded[node.node_id] for node in nodes]
+            store = LocalVectorStore(np.array(embeddings, dtype=np.float32), [node.metadata for node in nodes],
+                                     ids=list(range(len(nodes))), **store_kwargs)
+            return cls(store, nodes, embed_model, similarity_top_k)
+
+        @classmethod
+        def from_index(cls, index, similarity_top_k=3, **store_kwargs):
+            """Build over the nodes of a VectorStoreIndex, reusing the vectors persisted with it"""
+            data = getattr(index.vector_store, "data", None)
+            stored_embeddings = getattr(data, "embedding_dict", None)
+            return cls.from_nodes(index.docstore.docs.values(), index._embed_model, similarity_top_k,
+                                  stored_embeddings=stored_embeddings, **store_kwargs)
+
+        def filtered(self, where=None, date_range=None, similarity_top_k=None):
+            """A retriever over the same store that only searches matching nodes"""
+            return LocalVectorRetriever(self.store, self.nodes, self.embed_model,
+                                        similarity_top_k or self.similarity_top_k, where, date_range)
+
+        def _retrieve(self, query_bundle: QueryBundle):
+            query_embedding = query_bundle.embedding or self.embed_model.get_query_embedding(query_bundle.query_str)
+            hits = self.store.search(query_embedding, self.similarity_top_k, self.where, self.date_range)
+            return [NodeWithScore(node=self.nodes[row], score=score) for row, score, _ in hits]
@@ -0,0 +1,202 @@
+"""
+Long-lived query service over the episode corpus.
+
+Loads the persisted index (storage/episodes, see rag_index.py), the
+in-memory vector store and the BM25 index once, then answers queries over
+HTTP or JSON lines on stdin. Requests may carry one query or a batch;
+batches are answered concurrently.
+
+    python query_server.py --port 8780
+    curl -s localhost:8780/query -d '{"queries": ["masa", "japanese convenience store trend"], "synthesize": false}'
+
+    echo '{"query": "What does the text say about masa?"}' | python query_server.py --stdin
+
+Request fields: "query" or "queries", and optionally "top_k", "where"
+(metadata field -> value or list), "date_range" ([start, end] ISO dates) and
+"synthesize" (false returns the retrieved sources only). Every answer reports
+per-stage latency in milliseconds: retrieve (hybrid BM25 + vector), rerank
+(at most `max_per_episode` sources per episode) and synthesize (LLM answer).
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llama_index.core import QueryBundle, Settings
+from llama_index.core.response_synthesizers import get_response_synthesizer
+
+from bm25_index import HybridRetriever
+from corpus import iter_documents
+from embedding_cache import CachedEmbedding, default_embedding_cache
+from llm_cache import CachedLlamaOpenAI
+from local_vector_store import LocalVectorRetriever
+from rag_index import load_or_build_index
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+class QueryService:
+    def __init__(self, model="gpt-3.5-turbo", top_k=3, candidates=10, max_per_episode=2, workers=8):
+        # same settings and storage as llamaindex_rag_full_transcribes.py, so they share one index
+        Settings.llm = CachedLlamaOpenAI(model=model, temperature=0)
+        Settings.embed_model = CachedEmbedding(default_embedding_cache())
+        Settings.chunk_size = 600
+        Settings.chunk_overlap = 50
+
+        start = time.perf_counter()
+        index = load_or_build_index(iter_documents(), name="episodes")
+        vector_retriever = LocalVectorRetriever.from_index(index, similarity_top_k=candidates)
+        self.retriever = HybridRetriever(vector_retriever, similarity_top_k=candidates, candidates=2 * candidates)
+        self.synthesizer = get_response_synthesizer(response_mode="compact")
+        self.top_k = top_k
+        self.max_per_episode = max_per_episode
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.stats = {"queries": 0, "nodes": len(vector_retriever.nodes), "startup_ms": elapsed_ms(start)}
+        self.lock = threading.Lock()
+
+    def rerank(self, nodes, top_k):
+        """Keep the fused order but spread the sources over episodes"""
+        per_episode = {}
+        kept = []
+        for node in nodes:
+            episode = node.metadata.get("episode_id") or node.metadata.get("id")
+            if per_episode.get(episode, 0) >= self.max_per_episode:
+                continue
+            per_episode[episode] = per_episode.get(episode, 0) + 1
+            kept.append(node)
+            if len(kept) == top_k:
+                break
+        return kept
+
+    def answer(self, query, top_k=None, where=None, date_range=None, synthesize=True):
+        total = time.perf_counter()
+        timings = {}
+
+        start = time.perf_counter()
+        top_k = top_k or self.top_k
+        # the reranker picks from the fused candidates, so a larger top_k needs a larger pool
+        similarity_top_k = max(top_k, self.retriever.similarity_top_k)
+        if where or date_range or similarity_top_k > self.retriever.similarity_top_k:
+            retriever = self.retriever.filtered(where, tuple(date_range) if date_range else None, similarity_top_k)
+        else:
+            retriever = self.retriever
+        nodes = retriever.retrieve(QueryBundle(query))
+        timings["retrieve"] = elapsed_ms(start)
+
+        start = time.perf_counter()
+        nodes = self.rerank(nodes, top_k)
+        timings["rerank"] = elapsed_ms(start)
+
+        answer = None
+        if synthesize:
+            start = time.perf_counter()
+            answer = str(self.synthesizer.synthesize(query, nodes=nodes))
+            timings["synthesize"] = elapsed_ms(start)
+        timings["total"] = elapsed_ms(total)
+
+        with self.lock:
+            self.stats["queries"] += 1
+        return {
+            "query": query,
+            "answer": answer,
+            "sources": [
+                {
+                    "episode": node.metadata.get("episode_id") or node.metadata.get("id"),
+                    "date": node.metadata.get("date"),
+                    "start": node.metadata.get("start"),
+                    "score": node.score,
+                    "text": node.node.get_content()[:300],
+                }
+                for node in nodes
+            ],
+            "timings_ms": timings,
+        }
+
+    def handle(self, request):
+        """Answer a request with "query" or a "queries" batch; batches run concurrently"""
+        options = {key: request[key] for key in ("top_k", "where", "date_range", "synthesize") if key in request}
+        if "queries" not in request:
+            return self.answer(request["query"], **options)
+        start = time.perf_counter()
+        results = list(self.pool.map(lambda query: self.answer(query, **options), request["queries"]))
+        return {"results": results, "timings_ms": {"batch": elapsed_ms(start)}}
+
+
+def make_handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                self._send_json(200, service.stats)
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/query":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                result = service.handle(request)
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json(400, {"error": f"Bad request: {e}"})
+            except Exception as e:
+                # LLM, embedding or network failures: report them and keep serving
+                self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            else:
+                self._send_json(200, result)
+
+    return QueryHandler
+
+
+def serve_stdin(service):
+    """One JSON request per input line, one JSON answer per output line"""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = service.handle(json.loads(line))
+        except (KeyError, ValueError, TypeError) as e:
+            result = {"error": f"Bad request: {e}"}
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve RAG queries over the persisted episode index")
+    parser.add_argument("--stdin", action="store_true", help="read JSON-lines requests from stdin instead of HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--model", default="gpt-3.5-turbo", help="LLM used to synthesize answers")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8, help="queries of a batch answered concurrently")
+    args = parser.parse_args()
+
+    service = QueryService(model=args.model, top_k=args.top_k, workers=args.workers)
+    print(f"Index ready: {service.stats['nodes']} nodes in {service.stats['startup_ms']} ms", file=sys.stderr)
+
+    if args.stdin:
+        serve_stdin(service)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        print(f"Query server on http://{args.host}:{args.port}/query", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
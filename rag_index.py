@@ -0,0 +1,56 @@
+"""
+Persistent vector index for the RAG scripts.
+
+The first run embeds every document and persists the index under
+storage/<name>/<embedding model>. Later runs load it from disk and only
+sync the differences: documents whose hash changed (or that are new) are re-embedded through
+refresh_ref_docs, and documents that are no longer in the corpus are
+deleted. Documents therefore need stable ids (the episode id, or episode
+and chunk id), otherwise every run looks like a brand new corpus.
+
+The embedding model must be configured in Settings before calling
+load_or_build_index; each model gets its own index, so switching models
+never mixes vectors of different spaces.
+"""
+import os
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+
+from embedding_cache import model_slug
+
+STORAGE_DIR = "storage"
+
+
+def persist_dir_for(name, model_name=None):
+    model_name = model_name or Settings.embed_model.model_name
+    return os.path.join(STORAGE_DIR, name, model_slug(model_name))
+
+
+def sync_index(index, documents):
+    """Upsert changed documents and drop removed ones; returns (upserted, deleted) counts"""
+    refreshed = index.refresh_ref_docs(documents)
+    current = {doc.doc_id for doc in documents}
+    stale = [ref_doc_id for ref_doc_id in index.ref_doc_info if ref_doc_id not in current]
+    for ref_doc_id in stale:
+        index.delete_ref_doc(ref_doc_id, delete_from_docstore=True)
+    return sum(refreshed), len(stale)
+
+
+def load_or_build_index(documents, name="default", **index_kwargs):
+    """Load the index persisted under storage/<name>/<model> and bring it up to date with documents"""
+    documents = list(documents)
+    persist_dir = persist_dir_for(name)
+
+    if not os.path.exists(os.path.join(persist_dir, "docstore.json")):
+        index = VectorStoreIndex.from_documents(documents, **index_kwargs)
+        index.storage_context.persist(persist_dir=persist_dir)
+        print(f"Built index {persist_dir} from {len(documents)} documents")
+        return index
+
+    storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+    index = load_index_from_storage(storage_context, **index_kwargs)
+    upserted, deleted = sync_index(index, documents)
+    if upserted or deleted:
+        index.storage_context.persist(persist_dir=persist_dir)
+    print(f"Loaded index {persist_dir}: {upserted} documents upserted, {deleted} deleted")
+    return index
@@ -0,0 +1,107 @@
+"""
+Structured per-segment store written next to every transcript.
+
+segments/<stem>.jsonl holds one JSON object per Whisper segment with the float
+timestamps, tokens and confidence fields that the .txt transcript drops, so
+later stages can filter by time or confidence without regex-parsing
+"[HH:MM:SS --> HH:MM:SS]" lines. The directory as a whole is the corpus-wide
+dataset; export_parquet() turns it into one columnar file when pyarrow is
+installed.
+"""
+import json
+import os
+from pathlib import Path
+
+SEGMENT_DIR = Path("segments")
+
+# Whisper segment fields worth keeping; "model" is set by cascade transcription
+FIELDS = ["id", "start", "end", "text", "tokens", "avg_logprob", "no_speech_prob",
+          "compression_ratio", "temperature", "model"]
+
+
+def segment_path_for(episode_id, segment_dir=SEGMENT_DIR):
+    return Path(segment_dir) / f"{episode_id}.jsonl"
+
+
+def segment_record(episode_id, segment):
+    """Compact row for one segment"""
+    record = {"episode_id": episode_id}
+    for field in FIELDS:
+        if field not in segment:
+            continue
+        value = segment[field]
+        if field in ("start", "end"):
+            value = round(float(value), 2)
+        elif field == "text":
+            value = value.strip()
+        elif field == "tokens":
+            value = [int(token) for token in value]
+        elif isinstance(value, float):
+            value = round(value, 4)
+        record[field] = value
+    return record
+
+
+def format_records(episode_id, segments):
+    """JSONL text for segments, one line per segment"""
+    return "".join(json.dumps(segment_record(episode_id, segment), ensure_ascii=False) + "\n"
+                   for segment in segments)
+
+
+def write_segments(episode_id, segments, segment_dir=SEGMENT_DIR):
+    """Write segments/<episode_id>.jsonl atomically"""
+    path = segment_path_for(episode_id, segment_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(format_records(episode_id, segments))
+    os.replace(tmp_path, path)
+    return path
+
+
+def has_segments(episode_id, segment_dir=SEGMENT_DIR):
+    return segment_path_for(episode_id, segment_dir).exists()
+
+
+def iter_segments(episode_id, start=None, end=None, min_avg_logprob=None, max_no_speech_prob=None,
+                  segment_dir=SEGMENT_DIR):
+    """
+    Lazily yield the segments of one episode
+
+    Parameters:
+        start, end (float): Only segments overlapping [start, end) seconds
+        min_avg_logprob (float): Drop segments Whisper was less confident about
+        max_no_speech_prob (float): Drop segments that are probably not speech
+    """
+    with open(segment_path_for(episode_id, segment_dir), 'r', encoding='utf-8') as f:
+        for line in f:
+            segment = json.loads(line)
+            if start is not None and segment["end"] <= start:
+                continue
+            if end is not None and segment["start"] >= end:
+                continue
+            if min_avg_logprob is not None and segment.get("avg_logprob", 0.0) < min_avg_logprob:
+                continue
+            if max_no_speech_prob is not None and segment.get("no_speech_prob", 0.0) > max_no_speech_prob:
+                continue
+            yield segment
+
+
+def load_segments(episode_id, **filters):
+    """All matching segments of one episode as a list"""
+    return list(iter_segments(episode_id, **filters))
+
+
+def iter_corpus_segments(pattern="*.jsonl", segment_dir=SEGMENT_DIR, **filters):
+    """Yield matching segments of every episode in segment_dir"""
+    for path in sorted(Path(segment_dir).glob(pattern)):
+        yield from iter_segments(path.stem, segment_dir=segment_dir, **filters)
+
+
+def export_parquet(out_path="segments.parquet", segment_dir=SEGMENT_DIR):
+    """Write the whole corpus as one Parquet file (needs pyarrow)"""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(iter_corpus_segments(segment_dir=segment_dir))
+    frame.to_parquet(out_path, index=False)
+    return out_path
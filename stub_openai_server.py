@@ -0,0 +1,250 @@
+"""
+Local stand-in for the OpenAI chat-completions, files and batches APIs.
+
+Answers POST /v1/chat/completions with a deterministic reply (the last words
+of the last user message) so the summarization scripts can be exercised
+offline. Files uploaded with purpose "batch" can be submitted to
+/v1/batches; each batch completes after --batch-delay seconds with an output
+file in the OpenAI batch output format. Point the OpenAI client at it with
+
+    python stub_openai_server.py --port 8765 --fail-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python async_summarization.py
+
+--fail-rate makes a fraction of requests fail with 429 or 500 to exercise
+retries (and the same fraction of batch lines land in the batch's error
+file), and --latency adds a fixed delay per request.
+"""
+import argparse
+import email.parser
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_completion(body, reply_words=40):
+    """Chat completion response for a request body"""
+    messages = body.get("messages", [])
+    user_text = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    words = user_text.split()
+    reply = "Stub summary: " + " ".join(words[-reply_words:])
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(reply.split())
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": reply},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def run_batch(input_lines, fail_rate=0.0):
+    """Output and error JSONL for a batch input file; fail_rate of the lines fail with a server error"""
+    outputs, errors = [], []
+    for line in input_lines:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        if request.get("url") != "/v1/chat/completions":
+            errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id"),
+                           "response": None,
+                           "error": {"code": "invalid_url", "message": f"Unsupported url {request.get('url')}"}})
+            continue
+        if random.random() < fail_rate:
+            errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id"),
+                           "response": {"status_code": 500, "request_id": uuid.uuid4().hex,
+                                        "body": {"error": {"message": "Stub server error", "type": "server_error"}}},
+                           "error": {"code": "server_error", "message": "Stub server error"}})
+            continue
+        outputs.append({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                         "body": fake_completion(request["body"])},
+            "error": None,
+        })
+    to_jsonl = lambda rows: "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+    return to_jsonl(outputs), to_jsonl(errors), len(outputs), len(errors)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    fail_rate = 0.0
+    latency = 0.0
+    batch_delay = 1.0
+    stats = {"requests": 0, "failures": 0}
+    files = {}
+    batches = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _read_json(self):
+        return json.loads(self._read_body() or b"{}")
+
+    def _store_file(self, content, filename, purpose):
+        file_object = {
+            "id": f"file-{uuid.uuid4().hex[:24]}",
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_object["id"]] = (file_object, content)
+        return file_object
+
+    def _upload_file(self):
+        # multipart/form-data with "file" and "purpose" parts
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._read_body()
+        )
+        fields = {}
+        for part in message.get_payload():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        filename, content = fields["file"]
+        purpose = fields.get("purpose", (None, b"batch"))[1].decode()
+        self._send_json(200, self._store_file(content, filename or "upload.jsonl", purpose))
+
+    def _create_batch(self):
+        body = self._read_json()
+        if body.get("input_file_id") not in self.files:
+            self._send_json(404, {"error": {"message": "No such file"}})
+            return
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata"),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+
+        def finish():
+            time.sleep(self.batch_delay)
+            content = self.files[batch["input_file_id"]][1].decode("utf-8")
+            output, errors, completed, failed = run_batch(content.splitlines(), self.fail_rate)
+            # _store_file takes the lock itself, so both files are stored before it is held here
+            output_file = self._store_file(output, "batch_output.jsonl", "batch_output")
+            error_file = self._store_file(errors, "batch_errors.jsonl", "batch_output") if failed else None
+            with self.lock:
+                batch["output_file_id"] = output_file["id"]
+                if error_file:
+                    batch["error_file_id"] = error_file["id"]
+                batch["request_counts"] = {"total": completed + failed, "completed": completed, "failed": failed}
+                batch["status"] = "completed"
+                batch["completed_at"] = int(time.time())
+
+        threading.Thread(target=finish, daemon=True).start()
+        self._send_json(200, batch)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 3 and parts[1] == "batches" and parts[2] in self.batches:
+            # copy under the lock, send after releasing it so a slow client cannot stall the finisher
+            with self.lock:
+                batch = dict(self.batches[parts[2]])
+            self._send_json(200, batch)
+            return
+        if len(parts) == 4 and parts[1] == "files" and parts[3] == "content" and parts[2] in self.files:
+            with self.lock:
+                content = self.files[parts[2]][1]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/").endswith("/files"):
+            self._upload_file()
+            return
+        if self.path.rstrip("/").endswith("/batches"):
+            self._create_batch()
+            return
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            body = self._read_json()
+            with self.lock:
+                self.stats["requests"] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            if random.random() < self.fail_rate:
+                with self.lock:
+                    self.stats["failures"] += 1
+                if random.random() < 0.5:
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                                    {"retry-after": "0.2"})
+                else:
+                    self._send_json(500, {"error": {"message": "Stub server error", "type": "server_error"}})
+                return
+            self._send_json(200, fake_completion(body))
+            return
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def serve(host="127.0.0.1", port=8765, fail_rate=0.0, latency=0.0, batch_delay=1.0):
+    """Start the stub server in a background thread and return it"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "fail_rate": fail_rate,
+        "latency": latency,
+        "batch_delay": batch_delay,
+        "stats": {"requests": 0, "failures": 0},
+        "files": {},
+        "batches": {},
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat-completions and batch APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--batch-delay", type=float, default=1.0, help="seconds before a batch completes")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.fail_rate, args.latency, args.batch_delay)
+    print(f"Stub OpenAI server on http://{args.host}:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,42 +1,165 @@
 from dotenv import load_dotenv
 from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import datetime
+import hashlib
 import os
 
+from clean_episodes import token_counter
+from llm_cache import CachedOpenAI
+
 folder_path = 'cleaned_transcripts'
 output_folder_path = 'summary'
 
+MODEL = "gpt-3.5-turbo"
+MAX_TOKENS = 500
+TEMPERATURE = 0.1
+SYSTEM_PROMPT = "You are a helpful assistant that creates concise summaries of podcast transcripts. Focus on collecting details about food, beverages, flavors, ingredients, and recipes mentioned in the podcast. Summarize the content by topics, using 200 words per topic. If the podcast doesn't primarily discuss food-related subjects, summarize the main themes instead. Prioritize the most significant or frequently mentioned items if there's more content than the word limit allows."
+
+# map-reduce settings for transcripts that do not fit in one prompt
+SINGLE_PASS_TOKENS = 12000
+MAP_CHUNK_TOKENS = 3000
+MAP_PROMPT = "You are a helpful assistant that summarizes one part of a longer podcast transcript. Keep every concrete detail about food, beverages, flavors, ingredients, recipes, brands and trends mentioned in this part, as a compact list of notes."
+chunk_cache_folder = os.path.join(output_folder_path, '.chunk_cache')
+ERROR_LOG = os.path.join(output_folder_path, "errors.log")
+
+count_tokens = token_counter()
+
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 
-client = OpenAI()
-
-def summarize_transcript(transcript_text):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that creates concise summaries of podcast transcripts. Focus on collecting details about food, beverages, flavors, ingredients, and recipes mentioned in the podcast. Summarize the content by topics, using 200 words per topic. If the podcast doesn't primarily discuss food-related subjects, summarize the main themes instead. Prioritize the most significant or frequently mentioned items if there's more content than the word limit allows."},
-                {"role": "user", "content": f"Please summarize this podcast transcript:\n{transcript_text}"}
-            ],
-            max_tokens=500,
-            temperature=0.1
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {e}"
-    
-for filename in os.listdir(folder_path):
-    if filename.endswith('.txt'):
+def build_messages(transcript_text):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Please summarize this podcast transcript:\n{transcript_text}"}
+    ]
+
+def summary_path_for(filename):
+    return os.path.join(output_folder_path, f"summary_{filename}")
+
+def list_transcripts():
+    return [filename for filename in os.listdir(folder_path) if filename.endswith('.txt')]
+
+def write_summary(filename, summary):
+    """Write through a temp file so an interrupted run never leaves a truncated summary behind"""
+    summary_file_path = summary_path_for(filename)
+    tmp_path = summary_file_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as summary_file:
+        summary_file.write(summary)
+    os.replace(tmp_path, summary_file_path)
+
+def log_error(filename, error):
+    with open(ERROR_LOG, "a", encoding="utf-8") as f:
+        f.write(f"{datetime.datetime.now().isoformat()}\t{filename}\t{type(error).__name__}: {error}\n")
+
+def summarize_transcript(transcript_text, client=None):
+    """Single-pass summary; API errors are raised, never returned as summary text"""
+    client = client or OpenAI()
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=build_messages(transcript_text),
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
+    )
+    return response.choices[0].message.content
+
+def split_transcript(transcript_text, max_tokens=MAP_CHUNK_TOKENS):
+    """Pack the blank-line separated segments of a cleaned transcript into token-budgeted chunks"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in transcript_text.split("\n\n"):
+        segment = segment.strip()
+        if not segment:
+            continue
+        tokens = count_tokens(segment)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def summarize_chunk(chunk_text, client):
+    """Map step, cached on disk by a hash of everything that affects the answer"""
+    key_parts = [MODEL, MAP_PROMPT, str(MAX_TOKENS), str(TEMPERATURE), chunk_text]
+    key = hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+    cache_path = os.path.join(chunk_cache_folder, f"{key}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": MAP_PROMPT},
+            {"role": "user", "content": f"Transcript part:\n{chunk_text}"}
+        ],
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
+    )
+    summary = response.choices[0].message.content
+
+    os.makedirs(chunk_cache_folder, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(summary)
+    os.replace(tmp_path, cache_path)
+    return summary
+
+def summarize_long_transcript(transcript_text, client=None, max_workers=4):
+    """
+    Map-reduce summary: summarize token-budgeted chunks in parallel, then
+    summarize the chunk summaries with the normal prompt. Chunk summaries are
+    cached, so changing the final prompt only re-runs the reduce step. If the
+    chunk summaries are still too long they are reduced again the same way.
+    """
+    client = client or OpenAI()
+    text = transcript_text
+    while True:
+        chunks = split_transcript(text)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            partial_summaries = list(pool.map(lambda chunk: summarize_chunk(chunk, client), chunks))
+        text = "\n\n".join(partial_summaries)
+        # stop once it fits, or when another round would not merge any chunks
+        if count_tokens(text) <= SINGLE_PASS_TOKENS or len(split_transcript(text)) >= len(chunks):
+            break
+    return summarize_transcript(text, client)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize cleaned transcripts")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help=f"always use map-reduce (otherwise only above {SINGLE_PASS_TOKENS} tokens)")
+    args = parser.parse_args()
+
+    # identical prompts at temperature 0.1 are answered from .llm_cache.sqlite
+    client = CachedOpenAI(OpenAI())
+    os.makedirs(output_folder_path, exist_ok=True)
+    failed = 0
+
+    for filename in list_transcripts():
         file_path = os.path.join(folder_path, filename)
         with open(file_path, 'r', encoding='utf-8') as file:
             transcript_text = file.read()
 
-        # Summarize the transcript
-        summary = summarize_transcript(transcript_text)
+        # Summarize the transcript; long ones go through map-reduce
+        try:
+            if args.map_reduce or count_tokens(transcript_text) > SINGLE_PASS_TOKENS:
+                summary = summarize_long_transcript(transcript_text, client)
+            else:
+                summary = summarize_transcript(transcript_text, client)
+        except Exception as e:
+            # no summary file, so the next run tries this transcript again
+            log_error(filename, e)
+            print(f"Failed {filename}: {e}")
+            failed += 1
+            continue
 
         # Save the summary to a new file
-        summary_file_path = os.path.join(output_folder_path, f"summary_{filename}")
-        with open(summary_file_path, 'w', encoding='utf-8') as summary_file:
-            summary_file.write(summary)
+        write_summary(filename, summary)
 
-print("Summarization complete. Summaries saved in the same folder as the transcripts.")
\ No newline at end of file
+    print(f"Summarization complete. Summaries saved in {output_folder_path}, {failed} failed (see {ERROR_LOG}).")
+    print(f"LLM cache: {client.cache.stats()}")
@@ -1,4 +1,9 @@
 import os
+import sys
+
+# run from the repo root; the shared embedding cache lives there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 #load clean segments from transcripts
 input_folder = "cleaned_transcripts"
 input_file = "combined_cleaned_lines.txt"
@@ -17,30 +22,22 @@ print(f"Number of segments: {len(segments)}")
 
 # try to change a transformer model
 from bertopic import BERTopic
-from sentence_transformers import SentenceTransformer
+from embedding_cache import BERTopicEmbedder, EmbeddingCache, SentenceTransformerBackend
 from bertopic.representation import KeyBERTInspired, MaximalMarginalRelevance
-from sklearn.feature_extraction.text import CountVectorizer
-import spacy
 from umap import UMAP
 import hdbscan
+from lemma_analyzer import LemmaAnalyzer, LemmaCountVectorizer
+from umap_cache import CachedUMAP
 
-#load spaCy model for lemmatization
-nlp = spacy.load("en_core_web_sm")
-
-def lemmatize_text(text):
-    doc = nlp(text)
-    return " ".join([token.lemma_ for token in doc])
-
-#custom vectorizer with lemmatization
-class LemmaCountVectorizer(CountVectorizer):
-    def build_analyzer(self):
-        analyzer =  super(LemmaCountVectorizer, self).build_analyzer()
-        return lambda doc: (lemmatize_text(w) for w in analyzer(doc))
-    
 
-embedding_model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-embeddings = embedding_model.encode(segments)
-vectorizer_model = LemmaCountVectorizer(stop_words = "english")
+# same model as before, but vectors come from embedding_cache/ and only new
+# segments are encoded (set EMBEDDING_BACKEND=local to share them with RAG)
+embedding_cache = EmbeddingCache(SentenceTransformerBackend("sentence-transformers/all-mpnet-base-v2"))
+embedding_model = BERTopicEmbedder(embedding_cache)
+embeddings = embedding_cache.embed(segments, show_progress=True)
+#custom vectorizer with lemmatization: each distinct word is lemmatized once,
+#in batches through en_core_web_sm without parser/NER (same vocabulary as before)
+vectorizer_model = LemmaCountVectorizer(lemma_analyzer=LemmaAnalyzer(n_process=1), stop_words = "english")
 
 #create a KeyBERTInspired representation model
 keybert_model = KeyBERTInspired()
@@ -51,10 +48,12 @@ mmr_model = MaximalMarginalRelevance(diversity=0.8)
 #Combine the two representation models
 representation_model = [keybert_model, mmr_model]
 
-umap_model = UMAP(n_neighbors=30,
-                  n_components=5,
-                  min_dist=0.1,
-                  random_state=42)
+# fitted reductions are cached in umap_cache/ by embeddings + parameters, so
+# changing the representation or HDBSCAN settings does not rerun UMAP
+umap_model = CachedUMAP(UMAP(n_neighbors=30,
+                             n_components=5,
+                             min_dist=0.1,
+                             random_state=42))
 #If you want to get many tiny clusters, try increasing n_neighbors.
 #If you want more granular topics, decrease n_neighbors.
 #If topics are overlapping too much, try lowering min_dist.
@@ -79,7 +78,8 @@ topic_model = BERTopic(language="english",
                        hdbscan_model=hdbscan_model)
 
 
-topics, _ = topic_model.fit_transform(segments)
+# pass the cached embeddings so BERTopic does not embed the segments again
+topics, _ = topic_model.fit_transform(segments, embeddings=embeddings)
 topic_info = topic_model.get_topic_info()
 
 import pandas as pd
@@ -91,6 +91,10 @@ topic_info.to_csv('topic_info_full.csv', index=True)
 # show top words for topic 0
 #print(topic_model.get_topic(0))
 
+# hierarchy of the full topic set, taken from the fitted model before
+# reduce_topics (instead of fitting everything again at the end)
+hierarchical_topics = topic_model.hierarchical_topics(segments)
+
 #topic_model.merge_topics(segments, topics, topics_to_merge=[1, 2]) #merge topic 1 and 2
 topic_model.reduce_topics(segments, nr_topics=10)
 
@@ -116,17 +120,17 @@ numbers_to_remove = [10, 7]
 # Remove these numbers from combined_topics
 combined_topics = [x for x in combined_topics if x not in numbers_to_remove]
 
-# 2. Document visualization
+# 2. Document visualization (the 2D layout BERTopic would compute, cached)
+reduced_embeddings = CachedUMAP(UMAP(n_neighbors=10, n_components=2, min_dist=0.0,
+                                     metric='cosine')).fit_transform(embeddings)
 topic_model.visualize_documents(
     segments,
-    embeddings=embeddings,
+    reduced_embeddings=reduced_embeddings,
     topics=combined_topics, #can be changed to topic_of_interest or top_20_topics
     hide_annotations=False,
     custom_labels=True
 ).show()
 
 
-topics, probs = topic_model.fit_transform(segments)
-hierarchical_topics = topic_model.hierarchical_topics(segments)
 topic_model.visualize_hierarchy(hierarchical_topics=hierarchical_topics)
 
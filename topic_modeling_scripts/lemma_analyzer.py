@@ -0,0 +1,89 @@
+"""
+Batched, memoized spaCy lemmatization for BERTopic's CountVectorizer.
+
+The original LemmaCountVectorizer ran the full en_core_web_sm pipeline once
+per token the analyzer yielded. The lemma of each surface form is still
+computed the same way (the word on its own, so vocabularies do not change),
+but only once per distinct word: the vectorizer collects the words of the
+whole corpus first and lemmatizes the new ones in a single nlp.pipe pass
+with the parser and NER disabled (they do not affect lemmas), optionally on
+several processes. Results are kept in a bounded LRU cache.
+"""
+from collections import OrderedDict
+
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+class LemmaAnalyzer:
+    def __init__(self, nlp=None, model="en_core_web_sm", batch_size=2000, n_process=1, cache_size=500_000):
+        if nlp is None:
+            import spacy
+
+            nlp = spacy.load(model, disable=["parser", "ner"])
+        self.nlp = nlp
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def _store(self, word, lemma):
+        self.cache[word] = lemma
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def prime(self, words):
+        """Lemmatize every word not cached yet in one batched nlp.pipe pass"""
+        missing = list(dict.fromkeys(word for word in words if word not in self.cache))
+        if not missing:
+            return
+        # a handful of words is faster in-process than through a worker pool
+        n_process = self.n_process if len(missing) >= 10 * self.batch_size else 1
+        docs = self.nlp.pipe(missing, batch_size=self.batch_size, n_process=n_process)
+        for word, doc in zip(missing, docs):
+            self._store(word, " ".join(token.lemma_ for token in doc))
+
+    def lemma(self, word):
+        if word in self.cache:
+            self.cache.move_to_end(word)
+            return self.cache[word]
+        self.prime([word])
+        return self.cache[word]
+
+
+class LemmaCountVectorizer(CountVectorizer):
+    """
+    CountVectorizer whose tokens are replaced by their spaCy lemmas.
+    Pass a LemmaAnalyzer to control the pipeline, batching and n_process; a
+    default one is created on first use. Other arguments go to CountVectorizer.
+    """
+
+    def __init__(self, lemma_analyzer=None, **kwargs):
+        super().__init__(**kwargs)
+        self.lemma_analyzer = lemma_analyzer
+
+    @classmethod
+    def _get_param_names(cls):
+        # **kwargs hides CountVectorizer's parameters from get_params()/clone()
+        return sorted(set(CountVectorizer._get_param_names()) | {"lemma_analyzer"})
+
+    def _lemma_analyzer(self):
+        if self.lemma_analyzer is None:
+            self.lemma_analyzer = LemmaAnalyzer()
+        return self.lemma_analyzer
+
+    def build_analyzer(self):
+        analyzer = super().build_analyzer()
+        lemma_analyzer = self._lemma_analyzer()
+        return lambda doc: [lemma_analyzer.lemma(w) for w in analyzer(doc)]
+
+    def _prime(self, raw_documents):
+        raw_documents = list(raw_documents)
+        analyzer = super().build_analyzer()
+        self._lemma_analyzer().prime(word for doc in raw_documents for word in analyzer(doc))
+        return raw_documents
+
+    def fit_transform(self, raw_documents, y=None):
+        return super().fit_transform(self._prime(raw_documents), y)
+
+    def transform(self, raw_documents):
+        return super().transform(self._prime(raw_documents))
@@ -0,0 +1,272 @@
+# Incremental version of the BERTopic setup in bertopic_explore.py: new
+# segments are folded into a persisted model with partial_fit instead of
+# refitting the whole archive every week.
+#
+# BERTopic's online mode needs partial-fit-capable components, so UMAP,
+# HDBSCAN and the CountVectorizer are replaced by IncrementalPCA,
+# MiniBatchKMeans and OnlineCountVectorizer. Cluster centres and BERTopic's
+# topic mapper persist in the model, so a topic keeps its id across updates
+# and hand-curated lists like topics_of_interest stay valid for this model.
+# Only segments that were not folded in before (by content hash) are
+# processed. IncrementalPCA needs at least N_COMPONENTS segments per
+# partial_fit, so a smaller update is held back until enough new segments
+# have arrived.
+#
+# Each update writes a new generation of the model (model-<n>.pkl) and of the
+# seen-segment list (seen-<n>.txt), then switches state.json to it with one
+# os.replace. An interrupted run leaves state.json on the previous
+# generation, so the next run simply redoes the update.
+#
+# Every update reports what changed. A topic is flagged when it receives
+# documents for the first time, or when its share of the new segments is at
+# least --growth times its share of everything seen before. The number of
+# clusters is fixed, so a genuinely new theme is absorbed into an existing id.
+# To catch that, new segments lying farther from every cluster centre than
+# 95% of the previously seen segments are reported as novel, with their
+# most common words. Topics whose top words change substantially are
+# reported as well. Run from the repo root:
+#   python topic_modeling_scripts/online_topics.py                 # fold in new segments
+#   python topic_modeling_scripts/online_topics.py --input new_episode_cleaned.txt
+#   python topic_modeling_scripts/online_topics.py --reset --n-topics 60
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_cache import BERTopicEmbedder, EmbeddingCache, SentenceTransformerBackend, text_key
+
+MODEL_DIR = "online_topics"
+STATE_PATH = os.path.join(MODEL_DIR, "state.json")
+N_COMPONENTS = 5
+NOVELTY_PERCENTILE = 95
+
+
+def load_segments(paths):
+    segments = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            segments.extend(line.strip() for line in f if line.strip())
+    return segments
+
+
+def model_path(generation):
+    return os.path.join(MODEL_DIR, f"model-{generation}.pkl")
+
+
+def seen_path(generation):
+    return os.path.join(MODEL_DIR, f"seen-{generation}.txt")
+
+
+def load_state():
+    """Bookkeeping of the current generation; generation 0 means no model yet"""
+    if not os.path.exists(STATE_PATH):
+        return {"generation": 0, "topic_counts": {}, "updates": []}
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(STATE_PATH + ".tmp", STATE_PATH)
+
+
+def load_seen(generation):
+    if not generation:
+        return set()
+    with open(seen_path(generation), "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def write_seen(generation, seen):
+    with open(seen_path(generation) + ".tmp", "w", encoding="utf-8") as f:
+        f.write("".join(key + "\n" for key in sorted(seen)))
+    os.replace(seen_path(generation) + ".tmp", seen_path(generation))
+
+
+def save_generation(topic_model, seen, state):
+    """Write the next generation, then switch state.json to it (the only step that commits the update)"""
+    generation = state["generation"] + 1
+    topic_model.save(model_path(generation) + ".tmp", serialization="pickle", save_embedding_model=False)
+    os.replace(model_path(generation) + ".tmp", model_path(generation))
+    write_seen(generation, seen)
+    save_state(dict(state, generation=generation))
+    for path in (model_path(generation - 1), seen_path(generation - 1)):
+        if os.path.exists(path):
+            os.remove(path)
+    return generation
+
+
+def build_model(embedding_model, n_topics):
+    from bertopic import BERTopic
+    from bertopic.vectorizers import OnlineCountVectorizer
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+
+    return BERTopic(language="english",
+                    embedding_model=embedding_model,
+                    umap_model=IncrementalPCA(n_components=N_COMPONENTS),
+                    hdbscan_model=MiniBatchKMeans(n_clusters=n_topics, random_state=42),
+                    vectorizer_model=OnlineCountVectorizer(stop_words="english", decay=.01))
+
+
+def batches(items, batch_size, min_size):
+    """Consecutive slices of batch_size; a too-small tail is merged into the slice before it"""
+    batch_size = max(batch_size, min_size)
+    slices = [slice(start, start + batch_size) for start in range(0, len(items), batch_size)]
+    if len(slices) > 1 and len(items) - slices[-1].start < min_size:
+        slices = slices[:-2] + [slice(slices[-2].start, len(items))]
+    return slices
+
+
+def emerging_topics(new_counts, topic_counts, growth=3.0, min_docs=5):
+    """[(topic, new docs, reason)] for topics that are new or grew sharply in this update"""
+    total_new = sum(new_counts.values())
+    total_seen = sum(topic_counts.values())
+    flagged = []
+    for topic, count in sorted(new_counts.items(), key=lambda item: -item[1]):
+        if topic == -1 or count < min_docs:
+            continue
+        seen = topic_counts.get(str(topic), 0)
+        if seen == 0:
+            flagged.append((topic, count, "new topic"))
+        elif total_seen and count / total_new >= growth * seen / total_seen:
+            flagged.append((topic, count, f"share x{(count / total_new) / (seen / total_seen):.1f}"))
+    return flagged
+
+
+def centre_distances(topic_model, embeddings):
+    """Distance of each embedding to its nearest cluster centre in the reduced space"""
+    reduced = topic_model.umap_model.transform(embeddings)
+    centres = topic_model.hdbscan_model.cluster_centers_
+    return np.sqrt(((reduced[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+
+
+def top_words(topic_model, n=10):
+    return {topic: {word for word, _ in words[:n]} for topic, words in topic_model.get_topics().items()}
+
+
+def shifted_topics(words_before, words_after, min_overlap=0.3):
+    """[(topic, old words, new words)] for topics whose top words mostly changed"""
+    shifted = []
+    for topic, before in words_before.items():
+        after = words_after.get(topic, set())
+        if topic != -1 and before and len(before & after) / len(before | after) < min_overlap:
+            shifted.append((topic, before, after))
+    return shifted
+
+
+def frequent_words(segments, n=8):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    counts = CountVectorizer(stop_words="english").fit(segments)
+    totals = np.asarray(counts.transform(segments).sum(axis=0)).ravel()
+    vocabulary = counts.get_feature_names_out()
+    return [vocabulary[i] for i in np.argsort(-totals)[:n]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold new segments into the persisted online topic model")
+    parser.add_argument("--input", nargs="+",
+                        default=[os.path.join("cleaned_transcripts", "combined_cleaned_lines.txt")])
+    parser.add_argument("--n-topics", type=int, default=50, help="MiniBatchKMeans clusters (only for a new model)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--growth", type=float, default=3.0, help="share increase that flags a topic as emerging")
+    parser.add_argument("--min-docs", type=int, default=5)
+    parser.add_argument("--reset", action="store_true", help="start a new model")
+    args = parser.parse_args()
+
+    from bertopic import BERTopic
+
+    if args.reset and os.path.exists(MODEL_DIR):
+        shutil.rmtree(MODEL_DIR)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    # same embeddings as bertopic_explore.py, served from embedding_cache/
+    embedding_cache = EmbeddingCache(SentenceTransformerBackend("sentence-transformers/all-mpnet-base-v2"))
+    embedding_model = BERTopicEmbedder(embedding_cache)
+
+    state = load_state()
+    seen = load_seen(state["generation"])
+    segments = list(dict.fromkeys(load_segments(args.input)))
+    new_segments = [segment for segment in segments if text_key(segment) not in seen]
+    print(f"{len(segments)} segments, {len(new_segments)} not in the model yet")
+    if not new_segments:
+        return
+
+    if state["generation"]:
+        topic_model = BERTopic.load(model_path(state["generation"]), embedding_model=embedding_model)
+        # every partial_fit batch needs at least N_COMPONENTS rows for IncrementalPCA
+        min_batch = N_COMPONENTS
+    else:
+        topic_model = build_model(embedding_model, args.n_topics)
+        # the first batch also has to seed every MiniBatchKMeans cluster
+        min_batch = max(N_COMPONENTS, args.n_topics)
+    if len(new_segments) < min_batch:
+        print(f"Waiting for at least {min_batch} new segments before updating the model")
+        return
+
+    # float64: IncrementalPCA's state is float64 after the first batch, and MiniBatchKMeans
+    # rejects a later batch whose dtype differs from its (first-batch) centres
+    embeddings = embedding_cache.embed(new_segments, show_progress=True).astype(np.float64)
+    novel_segments = []
+    words_before = {}
+    if topic_model.topic_representations_:
+        distances = centre_distances(topic_model, embeddings)
+        threshold = state.get("novelty_threshold")
+        if threshold is not None:
+            novel_segments = [segment for segment, distance in zip(new_segments, distances) if distance > threshold]
+        words_before = top_words(topic_model)
+
+    new_topics = []
+    for part in batches(new_segments, args.batch_size, min_batch):
+        topic_model.partial_fit(new_segments[part], embeddings=embeddings[part])
+        new_topics.extend(topic_model.topics_)
+
+    topics, counts = np.unique(new_topics, return_counts=True)
+    new_counts = {int(topic): int(count) for topic, count in zip(topics, counts)}
+    flagged = emerging_topics(new_counts, state["topic_counts"], args.growth, args.min_docs)
+    for topic, count in new_counts.items():
+        state["topic_counts"][str(topic)] = state["topic_counts"].get(str(topic), 0) + count
+    shifted = shifted_topics(words_before, top_words(topic_model))
+    novel_words = frequent_words(novel_segments) if len(novel_segments) >= args.min_docs else []
+    # what counts as far from every centre, under the updated model
+    state["novelty_threshold"] = float(np.percentile(centre_distances(topic_model, embeddings), NOVELTY_PERCENTILE))
+    state["updates"].append({
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "segments": len(new_segments),
+        "emerging": [{"topic": topic, "documents": count, "reason": reason} for topic, count, reason in flagged],
+        "shifted": [{"topic": topic, "before": sorted(before), "after": sorted(after)}
+                    for topic, before, after in shifted],
+        "novel_segments": len(novel_segments),
+        "novel_words": novel_words,
+    })
+
+    save_generation(topic_model, seen | {text_key(segment) for segment in new_segments}, state)
+
+    pd.set_option('display.max_rows', None)
+    print(topic_model.get_topic_info()[["Topic", "Count", "Name"]])
+    if flagged:
+        print("Emerging topics:")
+        for topic, count, reason in flagged:
+            words = ", ".join(word for word, _ in topic_model.get_topic(topic)[:5])
+            print(f"  {topic}: {count} new segments ({reason}) - {words}")
+    if shifted:
+        print("Topics whose top words changed:")
+        for topic, before, after in shifted:
+            print(f"  {topic}: {', '.join(sorted(before)[:5])} -> {', '.join(sorted(after)[:5])}")
+    if novel_words:
+        print(f"{len(novel_segments)} new segments are far from every existing topic: {', '.join(novel_words)}")
+    if not (flagged or shifted or novel_words):
+        print("No emerging topics in this update")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Sweep UMAP/HDBSCAN settings for the BERTopic setup in bertopic_explore.py
+# instead of hand-editing n_neighbors, min_dist, min_cluster_size and
+# min_samples between runs.
+#
+# The segment embeddings are computed once (through embedding_cache/) and
+# saved as a .npy that every worker opens with mmap_mode="r", so the pool
+# shares one copy of the matrix. Each distinct UMAP setting is reduced once
+# (cached in umap_cache/ by CachedUMAP), then every HDBSCAN setting is
+# clustered on it concurrently. For each configuration the table records the
+# topic count, outlier ratio, NPMI coherence and diversity of the c-TF-IDF
+# top words, and wall time. Run from the repo root:
+#   python topic_modeling_scripts/topic_sweep.py
+#   python topic_modeling_scripts/topic_sweep.py --n-neighbors 10 30 50 --min-cluster-size 3 10 --workers 8
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from umap_cache import CachedUMAP
+
+SWEEP_DIR = "topic_sweep"
+TOP_WORDS = 10
+
+_embeddings = None
+
+
+def load_segments(file_path=os.path.join("cleaned_transcripts", "combined_cleaned_lines.txt")):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def init_worker(embeddings_path):
+    global _embeddings
+    _embeddings = np.load(embeddings_path, mmap_mode="r")
+
+
+def reduce_embeddings(umap_params):
+    """Fit and apply one UMAP setting (cached, so the clustering jobs only load it)"""
+    from umap import UMAP
+
+    start = time.perf_counter()
+    CachedUMAP(UMAP(random_state=42, **umap_params)).fit(_embeddings).transform(_embeddings)
+    return umap_params, time.perf_counter() - start
+
+
+def cluster(config):
+    """HDBSCAN labels for one configuration, plus the clustering time"""
+    import hdbscan
+    from umap import UMAP
+
+    umap_params, hdbscan_params = config
+    reduced = CachedUMAP(UMAP(random_state=42, **umap_params)).fit(_embeddings).transform(_embeddings)
+    start = time.perf_counter()
+    model = hdbscan.HDBSCAN(metric="euclidean", cluster_selection_method="eom", **hdbscan_params)
+    labels = model.fit_predict(reduced)
+    return config, labels, time.perf_counter() - start
+
+
+def topic_words(doc_terms, labels, top_n=TOP_WORDS):
+    """Top word columns per topic by BERTopic's class-based TF-IDF (outliers excluded)"""
+    topics = sorted(set(labels) - {-1})
+    if not topics:
+        return {}
+    membership = np.zeros((len(topics), len(labels)), dtype=np.float32)
+    for row, topic in enumerate(topics):
+        membership[row, labels == topic] = 1.0
+    tf = np.asarray(doc_terms.T.dot(membership.T).T)
+    average_words = tf.sum() / len(topics)
+    idf = np.log(1 + average_words / np.maximum(tf.sum(axis=0), 1))
+    ctfidf = tf / np.maximum(tf.sum(axis=1, keepdims=True), 1) * idf
+    return {topic: np.argsort(-ctfidf[row])[:top_n] for row, topic in enumerate(topics)}
+
+
+def npmi_coherence(binary_docs, words_by_topic):
+    """Mean pairwise NPMI of each topic's top words, by segment co-occurrence"""
+    n_docs = binary_docs.shape[0]
+    scores = []
+    for words in words_by_topic.values():
+        columns = binary_docs[:, words]
+        together = np.asarray((columns.T @ columns).todense(), dtype=np.float64) / n_docs
+        alone = np.diag(together)
+        pair_scores = []
+        for i, j in itertools.combinations(range(len(words)), 2):
+            if together[i, j] == 0:
+                pair_scores.append(-1.0)
+            elif together[i, j] == 1:
+                pair_scores.append(1.0)
+            else:
+                pmi = np.log(together[i, j] / (alone[i] * alone[j]))
+                pair_scores.append(pmi / -np.log(together[i, j]))
+        if pair_scores:
+            scores.append(np.mean(pair_scores))
+    return float(np.mean(scores)) if scores else float("nan")
+
+
+def diversity(words_by_topic):
+    """Share of unique words among all topics' top words"""
+    all_words = [word for words in words_by_topic.values() for word in words]
+    return len(set(all_words)) / len(all_words) if all_words else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel UMAP/HDBSCAN sweep for the BERTopic setup")
+    parser.add_argument("--n-neighbors", type=int, nargs="+", default=[15, 30, 50])
+    parser.add_argument("--min-dist", type=float, nargs="+", default=[0.0, 0.1])
+    parser.add_argument("--n-components", type=int, nargs="+", default=[5])
+    parser.add_argument("--min-cluster-size", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[2, 5])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="topic_sweep_results.csv")
+    args = parser.parse_args()
+
+    from embedding_cache import EmbeddingCache, SentenceTransformerBackend
+
+    segments = load_segments()
+    print(f"Number of segments: {len(segments)}")
+
+    # same model as bertopic_explore.py; only segments not in embedding_cache/ are encoded
+    embedding_cache = EmbeddingCache(SentenceTransformerBackend("sentence-transformers/all-mpnet-base-v2"))
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    embeddings_path = os.path.join(SWEEP_DIR, "embeddings.npy")
+    np.save(embeddings_path, embedding_cache.embed(segments, show_progress=True))
+
+    umap_grid = [dict(n_neighbors=n, min_dist=d, n_components=c)
+                 for n, d, c in itertools.product(args.n_neighbors, args.min_dist, args.n_components)]
+    hdbscan_grid = [dict(min_cluster_size=m, min_samples=s)
+                    for m, s in itertools.product(args.min_cluster_size, args.min_samples)]
+    configs = [(u, h) for u in umap_grid for h in hdbscan_grid]
+    print(f"{len(umap_grid)} UMAP x {len(hdbscan_grid)} HDBSCAN settings = {len(configs)} configurations")
+
+    # plain counts for the c-TF-IDF words and co-occurrence statistics
+    doc_terms = CountVectorizer(stop_words="english").fit_transform(segments).tocsc().astype(np.float32)
+    binary_docs = (doc_terms > 0).astype(np.float32).tocsc()
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(embeddings_path,)) as pool:
+        umap_seconds = {}
+        for umap_params, seconds in pool.map(reduce_embeddings, umap_grid):
+            umap_seconds[tuple(sorted(umap_params.items()))] = seconds
+
+        for (umap_params, hdbscan_params), labels, seconds in pool.map(cluster, configs):
+            words = topic_words(doc_terms, labels)
+            reduce_seconds = umap_seconds[tuple(sorted(umap_params.items()))]
+            rows.append({
+                **umap_params,
+                **hdbscan_params,
+                "topics": len(words),
+                "outliers": int(np.sum(labels == -1)),
+                "outlier_ratio": round(float(np.mean(labels == -1)), 3),
+                "coherence_npmi": round(npmi_coherence(binary_docs, words), 3),
+                "diversity": round(diversity(words), 3),
+                "umap_seconds": round(reduce_seconds, 2),
+                "hdbscan_seconds": round(seconds, 2),
+                "wall_seconds": round(reduce_seconds + seconds, 2),
+            })
+
+    results = pd.DataFrame(rows).sort_values(["coherence_npmi", "outlier_ratio"], ascending=[False, True])
+    pd.set_option('display.max_rows', None)
+    pd.set_option('display.width', 200)
+    print(results.to_string(index=False))
+    results.to_csv(args.output, index=False)
+    print(f"Saved {len(results)} configurations to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
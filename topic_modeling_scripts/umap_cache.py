@@ -0,0 +1,86 @@
+"""
+UMAP wrapper that caches fitted reductions on disk.
+
+BERTopic calls umap_model.fit(embeddings) and then
+umap_model.transform(embeddings). CachedUMAP keys the fitted model by a hash
+of the embedding matrix (plus labels, if any), the UMAP parameters and the
+umap version, and keys every transform result by the model key and the hash of
+its input. A re-run on the same embeddings with the same parameters loads
+both from umap_cache/ instead of recomputing them, and returns exactly what
+the first run computed. Changing representation, vectorizer or HDBSCAN
+settings then only redoes the cheap steps.
+"""
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import umap
+from umap import UMAP
+
+CACHE_DIR = "umap_cache"
+
+
+def array_hash(array):
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(str((array.dtype, array.shape)).encode("utf-8"))
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+class CachedUMAP:
+    def __init__(self, umap_model=None, cache_dir=CACHE_DIR, **umap_params):
+        self.umap_model = umap_model or UMAP(**umap_params)
+        self.cache_dir = cache_dir
+        self.model_key = None
+        self._model_path = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _params_key(self):
+        params = sorted(self.umap_model.get_params().items())
+        return json.dumps([umap.__version__, params], default=repr)
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def fit(self, X, y=None):
+        key_parts = [self._params_key(), array_hash(X), array_hash(np.asarray(y)) if y is not None else ""]
+        self.model_key = hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+        model_path = self._path(f"{self.model_key}.joblib")
+        if os.path.exists(model_path):
+            # loaded on first use; cached transforms do not need the model at all
+            self._model_path = model_path
+            return self
+        self._model_path = None
+        self.umap_model.fit(X, y=y)
+        joblib.dump(self.umap_model, model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        return self
+
+    def transform(self, X):
+        if self.model_key is None:
+            raise RuntimeError("CachedUMAP.transform called before fit")
+        result_path = self._path(f"{self.model_key}_{array_hash(X)[:32]}.npy")
+        if os.path.exists(result_path):
+            return np.load(result_path)
+        reduced = self.fitted_model().transform(X)
+        np.save(result_path + ".tmp.npy", reduced)
+        os.replace(result_path + ".tmp.npy", result_path)
+        return reduced
+
+    def fit_transform(self, X, y=None):
+        # like UMAP.fit_transform: the training layout, not a re-projection
+        return self.fit(X, y).fitted_model().embedding_
+
+    def fitted_model(self):
+        if self._model_path is not None:
+            self.umap_model = joblib.load(self._model_path)
+            self._model_path = None
+        return self.umap_model
+
+    def __getattr__(self, name):
+        # fitted attributes (embedding_, graph_, ...) come from the wrapped model
+        if name in ("umap_model", "_model_path"):
+            raise AttributeError(name)
+        return getattr(self.fitted_model(), name)
@@ -1,6 +1,8 @@
 import whisper
 import datetime
 import json
+import argparse
+import os
 from pathlib import Path
 import ssl
 
@@ -8,78 +10,241 @@ def format_timestamp(seconds):
     """Convert seconds to HH:MM:SS format"""
     return str(datetime.timedelta(seconds=round(seconds)))
 
-def transcribe_audio_with_timestamps(audio_path, model_size="base", language=None):
+def load_whisper_model(model_size="base"):
+    """Load a Whisper model once so it can be reused for many files"""
+    # Disable SSL verification for the model download
+    ssl._create_default_https_context = ssl._create_unverified_context
+
+    print(f"Loading Whisper {model_size} model...")
+    return whisper.load_model(model_size)
+
+def transcript_path_for(audio_path, transcript_dir="transcripts"):
+    """Path of the .txt transcript for an audio file"""
+    return Path(transcript_dir) / f"{Path(audio_path).stem}.txt"
+
+def format_segment_line(segment):
+    """One transcript line: [start --> end] text, with a [model] tag for cascade segments"""
+    start = format_timestamp(segment["start"])
+    end = format_timestamp(segment["end"])
+    text = segment["text"].strip()
+    if "model" in segment:
+        return f'[{start} --> {end}] [{segment["model"]}] {text}\n'
+    return f'[{start} --> {end}] {text}\n'
+
+def write_transcript(segments, txt_path):
+    """Save formatted transcript lines with timestamps, plus the structured segment store"""
+    # Write to a temp file and rename so readers never see a partial transcript
+    txt_path = Path(txt_path)
+    tmp_path = txt_path.with_name(txt_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for segment in segments:
+            f.write(format_segment_line(segment))
+    os.replace(tmp_path, txt_path)
+
+    from segment_store import write_segments
+    write_segments(txt_path.stem, segments)
+
+def transcribe_audio_with_timestamps(audio_path, model_size="base", language=None, model=None, verbose=True, audio=None,
+                                     vad=False, vad_report=True):
     """
     Transcribe an audio file with timestamps using Whisper
-    
+
     Parameters:
         audio_path (str): Path to the audio file
         model_size (str): Size of the model ("tiny", "base", "small", "medium", "large")
         language (str): Language code (e.g., "en" for English) or None for auto-detection
+        model: An already loaded Whisper model; loaded from model_size if None
+        verbose (bool): Passed to Whisper; None silences the per-segment output
+        audio (np.ndarray): Already decoded 16 kHz samples; decoded from audio_path if None
+        vad (bool): Skip non-speech audio with the voice-activity pre-pass
+        vad_report (bool): Append the vad stats to transcripts/vad_report.csv here; pool workers
+            pass False and leave the writing to the parent process
+
+    Returns the vad stats dict, or None without vad.
     """
-    # Add this line at the beginning of the function to disable SSL verification
-    ssl._create_default_https_context = ssl._create_unverified_context
-    
     # Create output paths
     audio_path = Path(audio_path)
-    base_path = audio_path.with_suffix('')
-    txt_path = Path("transcripts") / f"{base_path.stem}.txt" 
-    #json_path = base_path.with_name(f"{base_path.stem}_full.json")
+    txt_path = transcript_path_for(audio_path)
 
     # Load model
-    print(f"Loading Whisper {model_size} model...")
-    model = whisper.load_model(model_size)
+    if model is None:
+        model = load_whisper_model(model_size)
 
     # Transcribe
     print("Starting transcription...")
-    result = model.transcribe(
-        str(audio_path),
-        language="en",
-        verbose=True,  # Show progress
-    )
+    if vad:
+        from vad import append_vad_report, transcribe_speech_only
+        if audio is None:
+            audio = whisper.load_audio(str(audio_path))
+        segments, stats = transcribe_speech_only(model, audio, language=language, verbose=verbose)
+        if vad_report:
+            append_vad_report(audio_path.stem, stats)
+        print(f"Skipped {stats['skipped_seconds']}s of {stats['total_seconds']}s as non-speech")
+        result = {"segments": segments}
+    else:
+        stats = None
+        result = model.transcribe(
+            str(audio_path) if audio is None else audio,
+            language=language,
+            verbose=verbose,  # Show progress
+        )
 
-    # Save full result as JSON
-    #with open(json_path, 'w', encoding='utf-8') as f:
-     #   json.dump(result, f, indent=2, ensure_ascii=False)
-
-    # Save formatted transcript with timestamps
-    with open(txt_path, 'w', encoding='utf-8') as f:
-        for segment in result["segments"]:
-            start = format_timestamp(segment["start"])
-            end = format_timestamp(segment["end"])
-            text = segment["text"].strip()
-            f.write(f'[{start} --> {end}] {text}\n')
+    write_transcript(result["segments"], txt_path)
 
     print(f"\nTranscription completed!")
     print(f"Plain transcript saved to: {txt_path}")
-    #print(f"Full data saved to: {json_path}")
+    return stats
 
 if __name__ == "__main__":
-    # Example usage
+    parser = argparse.ArgumentParser(description="Transcribe podcasts/*.mp3 into transcripts/*.txt")
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of long-lived worker processes, each loading the model once")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="torch threads per worker process (only used with --workers > 1)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="split each episode into overlapping windows transcribed across the workers")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="append segments as they are decoded and resume interrupted episodes")
+    parser.add_argument("--window", type=float, default=300, help="chunked mode window length in seconds")
+    parser.add_argument("--overlap", type=float, default=5, help="chunked mode overlap in seconds")
+    parser.add_argument("--audio-cache", action="store_true",
+                        help="decode ahead in the background into a memory-mapped 16 kHz cache in audio_cache/")
+    parser.add_argument("--vad", action="store_true",
+                        help="drop silence and music beds before Whisper; report in transcripts/vad_report.csv")
+    parser.add_argument("--cascade", metavar="MODEL_SIZE",
+                        help="scan with tiny, then re-transcribe regions of interest with this model size")
+    parser.add_argument("--roi-keywords",
+                        help="comma separated keywords marking regions of interest in cascade mode")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list the episodes whose inputs changed without transcribing them")
+    args = parser.parse_args()
+    if args.vad and (args.chunked or args.checkpoint):
+        parser.error("--vad cannot be combined with --chunked or --checkpoint")
+    if args.chunked and args.checkpoint:
+        parser.error("--checkpoint cannot be combined with --chunked")
+    if args.cascade and (args.chunked or args.checkpoint or args.vad or args.workers > 1):
+        parser.error("--cascade runs serially and cannot be combined with other modes")
+
+    from transcript_manifest import plan_rebuild, print_dry_run, record_built
+
     podcast_dir = Path("podcasts")
     transcript_dir = Path("transcripts")
-    audio_files = list(podcast_dir.glob("*.mp3"))
-
-    print(f"Found {len(audio_files)} audio files")
-
-   # Process each file
-    for audio_file in audio_files:
-        # Check if transcript already exists
-        transcript_path = transcript_dir / f"{audio_file.stem}.txt"
-        
-        if transcript_path.exists():
-            print(f"Skipping {audio_file.name} - transcript already exists")
-            continue
-            
-        print(f"\nProcessing: {audio_file}")
-        try:
-            transcribe_audio_with_timestamps(
-                str(audio_file),
-                model_size="base",
-                language="en"
-            )
-        except Exception as e:
-            print(f"Error processing {audio_file}: {e}")
-            continue
-    
-    print("\nAll files processed!")
\ No newline at end of file
+    all_audio_files = list(podcast_dir.glob("*.mp3"))
+    print(f"Found {len(all_audio_files)} audio files")
+
+    # Only episodes whose audio, model, language, mode or Whisper version changed are redone
+    model_key = f"tiny+{args.cascade}" if args.cascade else args.model_size
+    if args.cascade:
+        mode = f"cascade:{args.roi_keywords}" if args.roi_keywords else "cascade"
+    elif args.chunked:
+        mode = f"chunked:{args.window:g}/{args.overlap:g}"
+    elif args.checkpoint:
+        mode = "checkpoint"
+    elif args.vad:
+        mode = "vad"
+    else:
+        mode = "plain"
+    to_build, manifest, inputs_by_stem = plan_rebuild(
+        all_audio_files, model_key, args.language, transcript_dir, mode=mode
+    )
+    if args.dry_run:
+        print_dry_run(to_build)
+        raise SystemExit(0)
+
+    for audio_file, reason in to_build:
+        print(f"Queued {audio_file.name}: {reason}")
+    audio_files = [audio_file for audio_file, _ in to_build]
+    # digests the manifest already computed, so the audio cache does not rehash the mp3s
+    sha256s = {str(audio_file): inputs_by_stem[audio_file.stem]["audio_sha256"] for audio_file in audio_files}
+
+    def record_episode(audio_file):
+        # saved after every episode, so an interrupted run keeps what it finished
+        record_built([audio_file], manifest, inputs_by_stem, transcript_dir)
+
+    if args.chunked:
+        from chunked_transcription import transcribe_files_chunked
+        failures = transcribe_files_chunked(
+            audio_files,
+            model_size=args.model_size,
+            language=args.language,
+            workers=args.workers,
+            torch_threads=args.threads,
+            window_seconds=args.window,
+            overlap_seconds=args.overlap,
+            audio_cache=args.audio_cache,
+            sha256s=sha256s,
+            on_done=record_episode,
+        )
+    elif args.workers > 1:
+        from whisper_pool import transcribe_with_pool
+        failures = transcribe_with_pool(
+            audio_files,
+            model_size=args.model_size,
+            language=args.language,
+            workers=args.workers,
+            torch_threads=args.threads,
+            audio_cache=args.audio_cache,
+            vad=args.vad,
+            checkpoint=args.checkpoint,
+            sha256s=sha256s,
+            on_done=record_episode,
+        )
+    else:
+        failures = []
+        if args.cascade:
+            from cascade_transcription import DEFAULT_KEYWORDS, cascade_transcribe
+            keywords = args.roi_keywords.split(",") if args.roi_keywords else DEFAULT_KEYWORDS
+            model = load_whisper_model("tiny") if audio_files else None
+            detail_model = load_whisper_model(args.cascade) if audio_files else None
+        else:
+            model = load_whisper_model(args.model_size) if audio_files else None
+
+        if args.audio_cache:
+            from audio_cache import prefetch_audio
+            # Decode the next episodes while the current one is transcribed
+            decoded = prefetch_audio(audio_files, sha256s=sha256s)
+        else:
+            decoded = ((audio_file, None, None) for audio_file in audio_files)
+
+        # Process each file
+        for audio_file, audio, decode_error in decoded:
+            print(f"\nProcessing: {audio_file}")
+            try:
+                if decode_error is not None:
+                    raise decode_error
+                if args.cascade:
+                    if audio is None:
+                        audio = whisper.load_audio(str(audio_file))
+                    segments, regions = cascade_transcribe(
+                        audio, model, detail_model, args.cascade, language=args.language, keywords=keywords
+                    )
+                    covered = sum(end - start for start, end in regions)
+                    print(f"Re-transcribed {len(regions)} regions ({covered:.0f}s) with {args.cascade}")
+                    write_transcript(segments, transcript_path_for(audio_file))
+                elif args.checkpoint:
+                    from checkpointed_transcription import transcribe_with_checkpoints
+                    transcribe_with_checkpoints(audio_file, model, language=args.language, audio=audio,
+                                                model_size=args.model_size, sha256=sha256s[str(audio_file)])
+                else:
+                    transcribe_audio_with_timestamps(
+                        str(audio_file),
+                        model_size=args.model_size,
+                        language=args.language,
+                        model=model,
+                        audio=audio,
+                        vad=args.vad,
+                    )
+            except Exception as e:
+                print(f"Error processing {audio_file}: {e}")
+                failures.append((str(audio_file), str(e)))
+                continue
+            record_episode(audio_file)
+
+    # also saves adopted legacy transcripts when nothing needed rebuilding
+    record_built([], manifest, inputs_by_stem, transcript_dir)
+    if failures:
+        print(f"\n{len(failures)} episodes failed and stay queued for the next run")
+
+    print("\nAll files processed!")
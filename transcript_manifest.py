@@ -0,0 +1,142 @@
+"""
+Build manifest for incremental transcription.
+
+transcripts/manifest.json maps each episode stem to the inputs its transcript
+was built from: the sha256 of the audio, the model size, the language, the
+transcription mode (plain, vad, chunked, checkpoint or cascade) and the
+Whisper version. An episode is redone when any of those change or its
+transcript is missing.
+"""
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+
+import whisper
+
+from transcribe_podcasts import transcript_path_for
+
+MANIFEST_NAME = "manifest.json"
+
+# Settings transcribe_podcasts.py used before the manifest existed
+BASELINE_SETTINGS = {"model_size": "base", "language": "en", "mode": "plain"}
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file in blocks so large mp3s are not read into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_inputs(audio_path, model_size, language, mode="plain"):
+    """The manifest entry a transcript of audio_path would be recorded under"""
+    return {
+        "audio_file": Path(audio_path).name,
+        "audio_sha256": file_sha256(audio_path),
+        "model_size": model_size,
+        "language": language,
+        "mode": mode,
+        "whisper_version": whisper.__version__,
+    }
+
+
+def load_manifest(transcript_dir="transcripts"):
+    manifest_path = Path(transcript_dir) / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest, transcript_dir="transcripts"):
+    """Write the manifest through a temp file so a crash cannot corrupt it"""
+    manifest_path = Path(transcript_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def rebuild_reason(inputs, recorded, transcript_exists):
+    """Why an episode needs transcribing, or None if it is up to date"""
+    if not transcript_exists:
+        return "no transcript"
+    for key in ("audio_sha256", "model_size", "language", "mode", "whisper_version"):
+        # entries written before "mode" was recorded were plain runs
+        if recorded.get(key, BASELINE_SETTINGS.get(key)) != inputs[key]:
+            return f"{key} changed"
+    return None
+
+
+def plan_rebuild(audio_files, model_size="base", language="en", transcript_dir="transcripts", mode="plain"):
+    """
+    Compare audio_files against the manifest
+
+    Returns (to_build, manifest, inputs_by_stem) where to_build is a list of
+    (audio_file, reason). Transcripts that exist but predate the manifest are
+    recorded under BASELINE_SETTINGS, so they are rebuilt only if the current
+    settings differ from those. Nothing is written here; record_built saves
+    the manifest after the run.
+    """
+    manifest = load_manifest(transcript_dir)
+    inputs_by_stem = {}
+    to_build = []
+    adopted = 0
+
+    for audio_file in audio_files:
+        stem = Path(audio_file).stem
+        inputs = build_inputs(audio_file, model_size, language, mode)
+        inputs_by_stem[stem] = inputs
+        transcript_exists = transcript_path_for(audio_file, transcript_dir).exists()
+
+        if stem not in manifest and transcript_exists:
+            manifest[stem] = dict(inputs, **BASELINE_SETTINGS)
+            adopted += 1
+
+        reason = rebuild_reason(inputs, manifest.get(stem, {}), transcript_exists)
+        if reason:
+            to_build.append((audio_file, reason))
+
+    if adopted:
+        print(f"Adopted {adopted} existing transcripts as {BASELINE_SETTINGS['model_size']}/"
+              f"{BASELINE_SETTINGS['language']}/{BASELINE_SETTINGS['mode']} transcripts")
+    return to_build, manifest, inputs_by_stem
+
+
+def record_built(audio_files, manifest, inputs_by_stem, transcript_dir="transcripts"):
+    """Record successfully transcribed files in the manifest"""
+    for audio_file in audio_files:
+        stem = Path(audio_file).stem
+        manifest[stem] = inputs_by_stem[stem]
+    save_manifest(manifest, transcript_dir)
+
+
+def audio_duration(audio_path):
+    """Duration in seconds via ffprobe, or None if it is unavailable"""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(audio_path)],
+            capture_output=True, text=True, check=True,
+        )
+        return float(out.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def print_dry_run(to_build):
+    """List what would be rebuilt and how much audio that is"""
+    total_seconds = 0.0
+    total_bytes = 0
+    for audio_file, reason in to_build:
+        duration = audio_duration(audio_file)
+        total_seconds += duration or 0.0
+        total_bytes += os.path.getsize(audio_file)
+        length = f"{duration / 60:.1f} min" if duration else "unknown length"
+        print(f"  {Path(audio_file).name}: {reason} ({length})")
+    print(f"{len(to_build)} episodes would be transcribed: "
+          f"{total_seconds / 3600:.2f} h of audio, {total_bytes / 1e6:.0f} MB")
@@ -0,0 +1,151 @@
+"""
+Cheap CPU voice-activity pre-pass for Whisper.
+
+Frames are classified from their RMS energy: a frame is speech when it is
+clearly above the episode's noise floor and the surrounding second shows the
+syllable-rate loudness modulation of speech. Steady beds (intro music, room
+tone) are loud but flat and get dropped along with dead air. The speech spans
+are concatenated, transcribed, and the segment timestamps are mapped back to
+the original audio through an offset map.
+
+Sponsor reads are speech and are kept; only acoustically non-speech audio is
+skipped.
+"""
+import bisect
+import csv
+import os
+
+import numpy as np
+import whisper
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+
+def frame_energy(audio, frame_seconds=0.03):
+    """RMS energy of consecutive non-overlapping frames"""
+    frame = int(SAMPLE_RATE * frame_seconds)
+    n_frames = len(audio) // frame
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def detect_speech(audio, frame_seconds=0.03, floor_margin_db=12.0, min_modulation_db=4.0,
+                  pad_seconds=0.25, min_gap_seconds=0.6, min_speech_seconds=0.4):
+    """
+    Return speech spans as a list of (start_sample, end_sample)
+
+    Parameters:
+        floor_margin_db (float): How far above the noise floor a frame must be
+        min_modulation_db (float): Std of frame loudness over ~1 s below which
+            the audio is considered a steady bed rather than speech
+        pad_seconds (float): Padding kept around every span
+        min_gap_seconds (float): Gaps shorter than this are bridged
+        min_speech_seconds (float): Shorter spans are dropped
+    """
+    frame = int(SAMPLE_RATE * frame_seconds)
+    db = 20 * np.log10(frame_energy(audio, frame_seconds) + 1e-10)
+    if len(db) == 0:
+        return []
+
+    noise_floor = np.percentile(db, 10)
+    loud = db > noise_floor + floor_margin_db
+
+    # Loudness variation over a ~1 s sliding window
+    width = max(int(1.0 / frame_seconds), 1)
+    kernel = np.ones(width) / width
+    # Edge padding keeps the first and last second from looking modulated
+    padded = np.pad(db, (width // 2, width - 1 - width // 2), mode='edge')
+    mean = np.convolve(padded, kernel, mode='valid')
+    var = np.convolve(padded ** 2, kernel, mode='valid') - mean ** 2
+    modulated = np.sqrt(np.maximum(var, 0)) > min_modulation_db
+
+    speech = loud & modulated
+
+    spans = []
+    pad = int(pad_seconds / frame_seconds)
+    min_gap = int(min_gap_seconds / frame_seconds)
+    min_len = int(min_speech_seconds / frame_seconds)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        start, end = max(start - pad, 0), min(end + pad, len(speech))
+        if spans and start - spans[-1][1] < min_gap:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+
+    return [(start * frame, min(end * frame, len(audio)))
+            for start, end in spans if end - start >= min_len]
+
+
+def build_speech_audio(audio, spans):
+    """
+    Concatenate the speech spans
+
+    Returns (speech_audio, offset_map) where offset_map is a list of
+    (speech_start_seconds, original_start_seconds) for each span.
+    """
+    if not spans:
+        return np.zeros(0, dtype=np.float32), []
+    pieces = []
+    offset_map = []
+    position = 0
+    for start, end in spans:
+        pieces.append(audio[start:end])
+        offset_map.append((position / SAMPLE_RATE, start / SAMPLE_RATE))
+        position += end - start
+    return np.concatenate(pieces).astype(np.float32, copy=False), offset_map
+
+
+def to_original_time(seconds, offset_map, is_end=False):
+    """
+    Map a timestamp in the concatenated speech audio back to the episode
+
+    An end time that lands exactly on a join belongs to the span before it.
+    """
+    starts = [speech_start for speech_start, _ in offset_map]
+    bisect_fn = bisect.bisect_left if is_end else bisect.bisect_right
+    i = max(bisect_fn(starts, seconds) - 1, 0)
+    speech_start, original_start = offset_map[i]
+    return original_start + (seconds - speech_start)
+
+
+def transcribe_speech_only(model, audio, language="en", verbose=None):
+    """
+    Transcribe only the speech spans of audio
+
+    Returns (segments, stats) with segment times on the original timeline and
+    stats holding total/speech/skipped seconds.
+    """
+    spans = detect_speech(audio)
+    speech_audio, offset_map = build_speech_audio(audio, spans)
+
+    total_seconds = len(audio) / SAMPLE_RATE
+    speech_seconds = len(speech_audio) / SAMPLE_RATE
+    stats = {
+        "total_seconds": round(total_seconds, 1),
+        "speech_seconds": round(speech_seconds, 1),
+        "skipped_seconds": round(total_seconds - speech_seconds, 1),
+    }
+    if not offset_map:
+        return [], stats
+
+    result = model.transcribe(speech_audio, language=language, verbose=verbose)
+    segments = []
+    for segment in result["segments"]:
+        segment = dict(segment)
+        segment["start"] = to_original_time(segment["start"], offset_map)
+        segment["end"] = max(to_original_time(segment["end"], offset_map, is_end=True), segment["start"])
+        segments.append(segment)
+    return segments, stats
+
+
+def append_vad_report(episode, stats, report_path="transcripts/vad_report.csv"):
+    """Add one row per episode so the skipped time can be checked later"""
+    new_file = not os.path.exists(report_path)
+    with open(report_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["episode", "total_seconds", "speech_seconds", "skipped_seconds", "skipped_pct"])
+        pct = 100 * stats["skipped_seconds"] / stats["total_seconds"] if stats["total_seconds"] else 0.0
+        writer.writerow([episode, stats["total_seconds"], stats["speech_seconds"],
+                         stats["skipped_seconds"], f"{pct:.1f}"])
@@ -0,0 +1,100 @@
+"""
+Transcribe many episodes with a pool of long-lived Whisper worker processes.
+
+Each worker loads the model once in its initializer and then pulls episodes
+from the pool's shared task queue, so the model load is paid once per worker
+instead of once per mp3.
+"""
+import multiprocessing as mp
+import time
+from pathlib import Path
+
+from transcribe_podcasts import load_whisper_model, transcribe_audio_with_timestamps
+
+# Model loaded by init_worker, one per worker process
+_model = None
+_model_size = None
+
+
+def init_worker(model_size, torch_threads):
+    global _model, _model_size
+    import torch
+
+    # Keep workers from oversubscribing the CPU
+    torch.set_num_threads(torch_threads)
+    _model = load_whisper_model(model_size)
+    _model_size = model_size
+
+
+def worker_model():
+    """The model loaded in this worker process"""
+    return _model
+
+
+def _transcribe_job(job):
+    """Run one episode; failures and vad stats are returned instead of handled in the worker"""
+    audio_path, language, audio_cache, vad, checkpoint, sha256 = job
+    started = time.perf_counter()
+    vad_stats = None
+    try:
+        audio = None
+        if audio_cache:
+            from audio_cache import load_cached_audio
+            audio = load_cached_audio(audio_path, sha256)
+        if checkpoint:
+            from checkpointed_transcription import transcribe_with_checkpoints
+            transcribe_with_checkpoints(audio_path, _model, language=language, audio=audio, model_size=_model_size,
+                                        sha256=sha256)
+        else:
+            vad_stats = transcribe_audio_with_timestamps(audio_path, language=language, model=_model, verbose=None,
+                                                         audio=audio, vad=vad, vad_report=False)
+        return audio_path, None, time.perf_counter() - started, vad_stats
+    except Exception as e:
+        return audio_path, str(e), time.perf_counter() - started, vad_stats
+
+
+def transcribe_with_pool(audio_files, model_size="base", language="en", workers=2, torch_threads=1,
+                         audio_cache=False, vad=False, checkpoint=False, sha256s=None, on_done=None):
+    """
+    Transcribe audio_files with `workers` processes sharing one task queue
+
+    Parameters:
+        audio_files (list): Paths to the audio files
+        model_size (str): Whisper model size loaded by every worker
+        language (str): Language code or None for auto-detection
+        workers (int): Number of worker processes
+        torch_threads (int): torch.set_num_threads value inside each worker
+        audio_cache (bool): Read decoded audio from the shared audio_cache/ store
+        sha256s (dict): Known audio digests by str(path), so the cache lookup does not rehash the mp3
+        on_done (callable): Called in this process with the path of each episode as soon as it succeeds
+        vad (bool): Transcribe only the speech spans found by the vad pre-pass
+        checkpoint (bool): Stream each episode through checkpointed_transcription so it can resume
+
+    Returns a list of (audio_path, error) for the files that failed.
+    """
+    sha256s = sha256s or {}
+    jobs = [(str(audio_file), language, audio_cache, vad, checkpoint, sha256s.get(str(audio_file)))
+            for audio_file in audio_files]
+    if not jobs:
+        return []
+
+    failures = []
+    # spawn keeps CUDA/OpenMP state from leaking into forked children
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=min(workers, len(jobs)),
+                  initializer=init_worker,
+                  initargs=(model_size, torch_threads)) as pool:
+        for audio_path, error, seconds, vad_stats in pool.imap_unordered(_transcribe_job, jobs):
+            if vad_stats is not None:
+                # written here so concurrent workers never append to the report at once
+                from vad import append_vad_report
+                append_vad_report(Path(audio_path).stem, vad_stats)
+            if error is None:
+                print(f"Finished {audio_path} in {seconds:.1f}s")
+                if on_done is not None:
+                    on_done(audio_path)
+            else:
+                print(f"Error processing {audio_path}: {error}")
+                failures.append((audio_path, error))
+
+    return failures